@@ -76,6 +76,50 @@ uint16_t ledIndex = 0;
 unsigned long lastLEDTime = 0;
 unsigned long ledInterval = 20; // 20ms mỗi bước rainbow
 
+// ================= BINARY TELEMETRY =================
+// Compact frame, decoded by telemetry/binary.py on the host:
+// A5 5A | len=8 | seq u8 | millis u32 | flags u8 | ldr u16 | crc16 (little-endian)
+// flags: bit0 F1, bit1 F2, bit2 F3, bit3 In, bit4 Out, bit5 Rain, bit6 Fire
+#define TELEMETRY_FRAME_SIZE 13
+bool binaryTelemetry = false;  // Text frames by default, switched with TELEMETRY_BINARY / TELEMETRY_TEXT
+uint8_t telemetrySeq = 0;
+
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), same as Python's binascii.crc_hqx(data, 0xFFFF)
+uint16_t crc16Ccitt(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+void sendBinaryTelemetry(int t1, int t2, int t3, int in, int out, int ldr, int rain, bool fire) {
+  uint8_t frame[TELEMETRY_FRAME_SIZE];
+  unsigned long now = millis();
+  uint8_t flags = (t1 ? 1 : 0) | (t2 ? 2 : 0) | (t3 ? 4 : 0) | (in ? 8 : 0)
+                | (out ? 16 : 0) | (rain ? 32 : 0) | (fire ? 64 : 0);
+
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  frame[2] = 8;
+  frame[3] = telemetrySeq++;
+  frame[4] = now & 0xFF;
+  frame[5] = (now >> 8) & 0xFF;
+  frame[6] = (now >> 16) & 0xFF;
+  frame[7] = (now >> 24) & 0xFF;
+  frame[8] = flags;
+  frame[9] = ldr & 0xFF;
+  frame[10] = (ldr >> 8) & 0xFF;
+  uint16_t crc = crc16Ccitt(frame + 2, 9);
+  frame[11] = crc & 0xFF;
+  frame[12] = (crc >> 8) & 0xFF;
+
+  Serial.write(frame, TELEMETRY_FRAME_SIZE);
+}
+
 // ================= SERIAL COMMAND PROCESSING =================
 void processSerialCommand() {
   if (Serial.available() > 0) {
@@ -160,6 +204,16 @@ void processSerialCommand() {
       Serial.println(">>> RAIN SHELTER: OPEN (retracted)");
     }
     
+    // Telemetry format
+    else if (command == "TELEMETRY_BINARY") {
+      binaryTelemetry = true;
+      Serial.println(">>> TELEMETRY: BINARY");
+    }
+    else if (command == "TELEMETRY_TEXT") {
+      binaryTelemetry = false;
+      Serial.println(">>> TELEMETRY: TEXT");
+    }
+    
     else {
       Serial.print(">>> Unknown command: ");
       Serial.println(command);
@@ -312,25 +366,29 @@ void loop() {
 
   // --- SENSOR DATA OUTPUT (reduced frequency) ---
   if (millis() % 500 < 50){
-    Serial.print("F1: ");
-    Serial.print(t1);
-    Serial.print(", F2: ");
-    Serial.print(t2);
-    Serial.print(", F3: ");
-    Serial.print(t3);
-    Serial.print(", In: ");
-    Serial.print(inSensor == 0 ? 1 : 0);
-    Serial.print(", Out: ");
-    Serial.print(outSensor == 0 ? 1 : 0);
-    Serial.print(", LDR: ");
     int lightValue = analogRead(LDR_PIN);
-    Serial.print(lightValue);
     int rain = digitalRead(RAIN_SENSOR);
-    Serial.print(", Rain: ");
-    Serial.print(rain == 0 ? 1 : 0);
-    Serial.print(", Fire: ");
-    Serial.println(fireDetected);
-    
+    if (binaryTelemetry) {
+      sendBinaryTelemetry(t1, t2, t3, inSensor == 0 ? 1 : 0, outSensor == 0 ? 1 : 0,
+                          lightValue, rain == 0 ? 1 : 0, fireDetected);
+    } else {
+      Serial.print("F1: ");
+      Serial.print(t1);
+      Serial.print(", F2: ");
+      Serial.print(t2);
+      Serial.print(", F3: ");
+      Serial.print(t3);
+      Serial.print(", In: ");
+      Serial.print(inSensor == 0 ? 1 : 0);
+      Serial.print(", Out: ");
+      Serial.print(outSensor == 0 ? 1 : 0);
+      Serial.print(", LDR: ");
+      Serial.print(lightValue);
+      Serial.print(", Rain: ");
+      Serial.print(rain == 0 ? 1 : 0);
+      Serial.print(", Fire: ");
+      Serial.println(fireDetected);
+    }
   }
 
 }
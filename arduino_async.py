@@ -0,0 +1,289 @@
+import asyncio
+import serial
+import time
+from typing import Dict, List, Optional, Union
+from arduino_comm import ArduinoController, BAUDRATE, parse_line
+from telemetry.schema import FINAL_INO_SCHEMA, TelemetrySchema
+
+
+# Async link settings
+RESET_DELAY = 2.0  # seconds, time the board needs to reboot after the port is opened
+POLL_INTERVAL = 0.005  # seconds, used for ports the event loop cannot watch (Windows, loop://)
+STREAM_LIMIT = 64 * 1024  # Longest line accepted from the device (bytes)
+
+
+class AsyncArduinoController:
+    """An asyncio counterpart of ArduinoController
+        The port is opened non-blocking and serviced by the event loop, so a single loop
+        can drive many links together with timers and network front-ends, without threads.
+        Accepts anything serial.serial_for_url() understands, e.g. "COM3" or "loop://" """
+    def __init__(self, schema: Optional[TelemetrySchema] = FINAL_INO_SCHEMA):
+        self.serial_connection: Optional[serial.SerialBase] = None
+        self.is_connected_flag = False
+        self.data_cache: Dict[str, Union[int, float, str, None]] = {}
+        self.last_raw_data: str = ""
+        self._frame_parser = schema.compile() if schema is not None else None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._watched_fd: Optional[int] = None
+        self._poll_handle: Optional[asyncio.TimerHandle] = None
+
+    @staticmethod
+    def list_available_ports() -> List[str]:
+        """Returns all available COM ports on the system"""
+        return ArduinoController.list_available_ports()
+
+    async def connect(self, port: str, baudrate: int = BAUDRATE, reset_delay: float = RESET_DELAY) -> bool:
+        """Attempts to connect to the Arduino on the specified port"""
+        try:
+            if self.is_connected_flag:
+                self.disconnect()
+
+            # timeout=0 makes every read return immediately, the loop does the waiting
+            self.serial_connection = serial.serial_for_url(
+                port,
+                baudrate=baudrate,
+                timeout=0
+            )
+
+            # Wait for Arduino to reset after connection, without blocking the loop
+            await asyncio.sleep(reset_delay)
+
+            # Clear any initial garbage data
+            if self.serial_connection.in_waiting > 0:
+                self.serial_connection.read_all()
+
+            self._loop = asyncio.get_running_loop()
+            self._reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+            self._write_lock = asyncio.Lock()
+            self._start_watching()
+
+            self.is_connected_flag = True
+            print(f"Connected to Arduino on {port} at {baudrate} baud")
+            return True
+
+        except serial.SerialException as e:
+            print(f"Failed to connect to {port}: {e}")
+            self._close_port()
+            return False
+        except Exception as e:
+            print(f"Unexpected error during connection: {e}")
+            self._close_port()
+            return False
+
+    def disconnect(self) -> None:
+        """Disconnect from the Arduino (returns immediately, nothing to await)"""
+        if self.serial_connection and self.serial_connection.is_open:
+            print("Disconnected from Arduino")
+        self._close_port()
+
+    def is_connected(self) -> bool:
+        """Check if currently connected to Arduino"""
+        return self.is_connected_flag and \
+               self.serial_connection is not None and \
+               self.serial_connection.is_open
+
+    def _start_watching(self) -> None:
+        """Feed incoming bytes into the stream reader, by fd readiness where possible"""
+        try:
+            fd = self.serial_connection.fileno()
+            self._loop.add_reader(fd, self._on_readable)
+            self._watched_fd = fd
+            # Non-blocking writes, leftovers wait for fd writability (see write)
+            self.serial_connection.write_timeout = 0
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            # No pollable file descriptor (Windows handles, loop://), fall back to polling.
+            # Writes there go straight into the driver's buffer and return at once
+            self._poll_handle = self._loop.call_soon(self._poll)
+
+    def _stop_watching(self) -> None:
+        """Stop feeding the stream reader"""
+        if self._watched_fd is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self._watched_fd)
+        self._watched_fd = None
+
+        if self._poll_handle is not None:
+            self._poll_handle.cancel()
+            self._poll_handle = None
+
+    def _on_readable(self) -> None:
+        """Move everything the port has buffered into the stream reader"""
+        try:
+            data = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+        except serial.SerialException as e:
+            print(f"Serial error while reading: {e}")
+            self._link_lost()
+            return
+        except Exception as e:
+            print(f"Unexpected error while reading: {e}")
+            self._link_lost()
+            return
+
+        if data:
+            self._reader.feed_data(data)
+
+    def _poll(self) -> None:
+        """Polling fallback for ports without a pollable file descriptor"""
+        self._on_readable()
+        if self.is_connected_flag:
+            self._poll_handle = self._loop.call_later(POLL_INTERVAL, self._poll)
+
+    def _link_lost(self) -> None:
+        """Mark the link as down and wake up anyone waiting for a line"""
+        self.is_connected_flag = False
+        self._stop_watching()
+        if self._reader is not None:
+            self._reader.feed_eof()
+
+    def _close_port(self) -> None:
+        """Close the port and release the loop resources"""
+        self._link_lost()
+        if self.serial_connection is not None and self.serial_connection.is_open:
+            self.serial_connection.close()
+        self.serial_connection = None
+
+    async def read_line(self) -> Optional[str]:
+        """Wait for the next non-empty line, parse it into the cache and return it
+            Returns None once the link is closed"""
+        reader = self._reader
+        while reader is not None:
+            try:
+                raw_line = await reader.readline()
+            except ValueError:
+                # Line longer than STREAM_LIMIT, the reader drops it
+                continue
+
+            if not raw_line:
+                return None  # EOF
+
+            decoded_line = raw_line.decode('utf-8', errors='ignore').strip()
+            if decoded_line:
+                self.last_raw_data = decoded_line
+                self._parse_data(decoded_line)
+                return decoded_line
+
+        return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        line = await self.read_line()
+        if line is None:
+            raise StopAsyncIteration
+        return line
+
+    def _parse_data(self, data_line: str) -> None:
+        """Parse incoming data and update the cache"""
+        values = None
+        if self._frame_parser is not None:
+            values = self._frame_parser(data_line)
+        if values is None:
+            values = parse_line(data_line)
+
+        if values:
+            self.data_cache.update(values)
+
+    def get_value(self, label: str):
+        """Get the latest reading for a specific label"""
+        return self.data_cache.get(label)
+
+    def get_all_values(self):
+        """Get all current values"""
+        return self.data_cache.copy()
+
+    def get_last_raw_data(self) -> str:
+        """Get the last raw data string received from Arduino"""
+        return self.last_raw_data
+
+    async def write(self, command: str) -> bool:
+        """Send a command/data to the Arduino
+            Never blocks the loop: whatever the OS does not accept right away is retried
+            when the port becomes writable"""
+        if not self.is_connected():
+            print("Cannot write: Not connected to Arduino")
+            return False
+
+        # Ensure command ends with newline
+        if not command.endswith('\n'):
+            command += '\n'
+        data = memoryview(command.encode('utf-8'))
+
+        try:
+            # One command at a time so concurrent writers never interleave bytes
+            async with self._write_lock:
+                while data:
+                    written = self.serial_connection.write(data) or 0
+                    data = data[written:]
+                    if data:
+                        await self._wait_writable()
+
+            print(f"Sent to Arduino: {command.strip()}")
+            return True
+
+        except serial.SerialException as e:
+            print(f"Serial error while writing: {e}")
+            self._link_lost()
+            return False
+        except Exception as e:
+            print(f"Unexpected error while writing: {e}")
+            return False
+
+    async def _wait_writable(self) -> None:
+        """Wait until the port can accept more data"""
+        if self._watched_fd is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            return
+
+        ready = self._loop.create_future()
+        self._loop.add_writer(self._watched_fd, ready.set_result, None)
+        try:
+            await ready
+        finally:
+            self._loop.remove_writer(self._watched_fd)
+
+
+async def _demo(port: str) -> None:
+    """Read lines for 10 seconds and send a test command after 2 seconds"""
+    controller = AsyncArduinoController()
+    if not await controller.connect(port):
+        return
+
+    async def send_test():
+        await asyncio.sleep(2)
+        await controller.write("test")
+
+    async def print_lines():
+        async for line in controller:
+            print(f"Raw: {line}")
+            print(f"Parsed data: {controller.get_all_values()}")
+            print("-" * 60)
+
+    sender = asyncio.ensure_future(send_test())
+    start = time.monotonic()
+    try:
+        await asyncio.wait_for(print_lines(), timeout=10)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        sender.cancel()
+        controller.disconnect()
+    print(f"Done after {time.monotonic() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    # List available ports
+    print("Available COM ports:")
+    ports = AsyncArduinoController.list_available_ports()
+    for port in ports:
+        print(f"  - {port}")
+
+    if not ports:
+        print("No COM ports found!")
+    else:
+        try:
+            asyncio.run(_demo(ports[0]))
+        except KeyboardInterrupt:
+            print("\nStopped by user")
@@ -1,21 +1,97 @@
 import serial
 import serial.tools.list_ports
+import threading
 import time
-from typing import Dict, List, Optional, Union
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple, Union
+from concurrent.futures import Future
+from command_tracker import CommandTracker
+from telemetry import binary
+from telemetry.events import EventBus
+from telemetry.history import HISTORY_CAPACITY, TelemetryHistory
+from telemetry.recorder import TelemetryRecorder
+from telemetry.schema import FINAL_INO_SCHEMA, TelemetrySchema
 
 
 # Serial settings
 BAUDRATE = 115200
 TIMEOUT = 1.0  # seconds
 
+# Readiness detection
+BANNER = "=== He thong tong hop ESP32-S3 ==="  # Printed by FINAL.ino at the end of setup()
+READY_TIMEOUT = 5.0  # seconds, longest wait for the banner or a first valid frame
+READY_POLL = 0.05  # seconds, read timeout while waiting
+
+# Background reader settings
+LINE_QUEUE_SIZE = 256  # Most recent raw lines kept for consumers, older lines are dropped
+READER_JOIN_TIMEOUT = 2.0  # seconds
+MAX_LINE_LENGTH = 4096  # bytes, a longer run without a newline is treated as garbage and dropped
+
+
+def parse_line(data_line: str) -> Dict[str, Union[int, float, str, None]]:
+    """Parse a line of "label: value" pairs into a dict of typed values
+        Example format: label1: value1, label2: value2
+        Example input data: temp: 26, humidity: 10"""
+    values: Dict[str, Union[int, float, str, None]] = {}
+    try:
+        # Parse "label: value" pairs separated by commas
+        if ':' in data_line:
+            pairs = data_line.split(',')
+            for pair in pairs:
+                if ':' in pair:
+                    label, value = pair.split(':', 1)
+                    label = label.strip()
+                    value = value.strip()
+                    
+                    # Try to convert to appropriate type
+                    try:
+                        # Try integer first
+                        if '.' not in value:
+                            values[label] = int(value)
+                        else:
+                            # Try float
+                            values[label] = float(value)
+                    except ValueError:
+                        # Keep as string if not a number
+                        values[label] = value
+        
+    except Exception as e:
+        print(f"Error parsing data '{data_line}': {e}")
+    
+    return values
+
 
 class ArduinoController:
     """A class that handles the serial communication between Python and Arduino"""
-    def __init__(self):
+    def __init__(self, schema: Optional[TelemetrySchema] = FINAL_INO_SCHEMA):
         self.serial_connection: Optional[serial.Serial] = None
         self.is_connected_flag = False
         self.data_cache: Dict[str, Union[int, float, str, None]] = {}
         self.last_raw_data: str = ""
+        self.update_count = 0  # Number of cache updates, lets consumers detect new data cheaply
+        
+        # Fast path for the known telemetry frame, anything else goes through parse_line()
+        self.schema = schema
+        self._frame_parser = schema.compile() if schema is not None else None
+        
+        # Optional in-memory history and on-disk log of every frame (see enable_history / recorder)
+        self.history: Optional[TelemetryHistory] = None
+        self.recorder: Optional[TelemetryRecorder] = None
+        self.tracker = CommandTracker()  # Acknowledgements of the commands sent
+        self.events = EventBus()  # Field change notifications, see telemetry/events.py
+
+        # Background reader (opt-in, see start_reader)
+        self.line_queue: Deque[str] = deque(maxlen=LINE_QUEUE_SIZE)
+        self._rx_buffer = bytearray()  # Reassembly buffer, holds the partial line between reads
+        self.telemetry_mode: Optional[str] = None  # "text" or "binary", detected from the frames received
+        self.last_frame_seq: Optional[int] = None  # Sequence number of the last binary frame
+        self._reader_thread: Optional[threading.Thread] = None
+        self._reader_stop = threading.Event()
+        
+        # Readiness detection (see connect)
+        self.ready = False  # The board sent its banner or a valid frame since connect()
+        self._ready = threading.Event()
+        self._skip_partial = False
     
     @staticmethod
     def list_available_ports() -> List[str]:
@@ -23,8 +99,12 @@ class ArduinoController:
         ports = serial.tools.list_ports.comports()
         return [port.device for port in ports]
     
-    def connect(self, port: str, baudrate: int = BAUDRATE) -> bool:
-        """Attempts to connect to the Arduino on the specified port"""
+    def connect(self, port: str, baudrate: int = BAUDRATE, ready_timeout: float = READY_TIMEOUT,
+                cancel: Optional[threading.Event] = None) -> bool:
+        """Attempts to connect to the Arduino on the specified port
+            Returns as soon as the board is ready (boot banner or first valid telemetry frame),
+            or after ready_timeout seconds. Blocks meanwhile, so call it off the GUI thread.
+            Setting cancel abandons the wait within READY_POLL: the port is closed and False returned"""
         try:
             if self.is_connected_flag:
                 self.disconnect()
@@ -35,12 +115,16 @@ class ArduinoController:
                 timeout=TIMEOUT
             )
             
-            # Wait for Arduino to reset after connection
-            time.sleep(2)
-            
-            # Clear any initial garbage data
-            if self.serial_connection.in_waiting > 0:
-                self.serial_connection.read_all()
+            # Wait until the board talks instead of a fixed reset delay
+            self.ready = self._wait_ready(ready_timeout, cancel)
+            if cancel is not None and cancel.is_set():
+                self.serial_connection.close()
+                self.serial_connection = None
+                self.ready = False
+                print(f"Connection to {port} cancelled")
+                return False
+            if not self.ready:
+                print(f"No banner or telemetry from {port} within {ready_timeout} s, continuing anyway")
             
             self.is_connected_flag = True
             print(f"Connected to Arduino on {port} at {baudrate} baud")
@@ -49,18 +133,48 @@ class ArduinoController:
         except serial.SerialException as e:
             print(f"Failed to connect to {port}: {e}")
             self.is_connected_flag = False
+            if self.serial_connection is not None and self.serial_connection.is_open:
+                self.serial_connection.close()
             return False
         except Exception as e:
             print(f"Unexpected error during connection: {e}")
             self.is_connected_flag = False
+            if self.serial_connection is not None and self.serial_connection.is_open:
+                self.serial_connection.close()
             return False
     
+    def _wait_ready(self, ready_timeout: float, cancel: Optional[threading.Event] = None) -> bool:
+        """Handle incoming data until the board is ready, returns False on timeout or cancel"""
+        self._ready.clear()
+        self._rx_buffer.clear()
+        # Whatever was in flight when the port opened may start mid-line
+        self._skip_partial = True
+        deadline = time.monotonic() + ready_timeout
+        
+        self.serial_connection.timeout = READY_POLL
+        try:
+            while not self._ready.is_set():
+                if time.monotonic() >= deadline or (cancel is not None and cancel.is_set()):
+                    return False
+                chunk = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+                if chunk:
+                    self._consume_bytes(chunk)
+            return True
+        finally:
+            self.serial_connection.timeout = TIMEOUT
+    
     def disconnect(self) -> None:
         """Disconnect from the Arduino"""
+        self.stop_reader()
+
         if self.serial_connection and self.serial_connection.is_open:
             self.serial_connection.close()
             print("Disconnected from Arduino")
         
+        self._rx_buffer.clear()
+        self.tracker.fail_all(ConnectionError("Disconnected from Arduino"))
+        self.telemetry_mode = None
+        self.ready = False
         self.is_connected_flag = False
         self.serial_connection = None
     
@@ -70,62 +184,207 @@ class ArduinoController:
                self.serial_connection is not None and \
                self.serial_connection.is_open
     
+    def start_reader(self) -> bool:
+        """Start a background thread that continuously drains the serial port into the cache
+            While the reader is running it owns the port: read_data() becomes a no-op and
+            consumers should use get_snapshot() / get_lines() instead"""
+        if not self.is_connected():
+            print("Cannot start reader: Not connected to Arduino")
+            return False
+        
+        if self.is_reader_running():
+            return True
+        
+        self._reader_stop.clear()
+        self._reader_thread = threading.Thread(target=self._reader_loop, name="ArduinoReader", daemon=True)
+        self._reader_thread.start()
+        return True
+    
+    def stop_reader(self) -> None:
+        """Stop the background reader thread if it is running"""
+        if self._reader_thread is None:
+            return
+        
+        self._reader_stop.set()
+        
+        # Wake up a readline() that is blocked waiting for data
+        try:
+            if self.serial_connection is not None and self.serial_connection.is_open:
+                self.serial_connection.cancel_read()
+        except Exception:
+            pass
+        
+        if self._reader_thread is not threading.current_thread():
+            self._reader_thread.join(READER_JOIN_TIMEOUT)
+        self._reader_thread = None
+    
+    def is_reader_running(self) -> bool:
+        """Check if the background reader thread is alive"""
+        return self._reader_thread is not None and self._reader_thread.is_alive()
+    
+    def _reader_loop(self) -> None:
+        """Body of the background reader thread"""
+        while not self._reader_stop.is_set():
+            try:
+                # Take whatever is buffered in one call; when idle, block for at most
+                # TIMEOUT on the first byte so the stop flag is checked regularly
+                chunk = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+                if chunk:
+                    self._consume_bytes(chunk)
+                self.tracker.expire()
+            except serial.SerialException as e:
+                if not self._reader_stop.is_set():
+                    print(f"Serial error while reading: {e}")
+                    self.is_connected_flag = False
+                break
+            except Exception as e:
+                # The port was closed underneath us, or a bug in a handler: never stop silently
+                if not self._reader_stop.is_set():
+                    print(f"Unexpected error in the reader thread: {type(e).__name__}: {e}")
+                    self.is_connected_flag = False
+                break
+    
     def read_data(self) -> bool:
-        """Read and parse incoming serial data from Arduino
+        """Read and parse incoming serial data from Arduino, returns True if any line was parsed
             Example format: label1: value1, label2: value2
             Example input data: temp: 26, humidity: 10"""
-        if not self.is_connected():
-            return False
+        return bool(self.read_lines())
+    
+    def read_lines(self) -> List[str]:
+        """Read everything the port has buffered with a single read() and handle every complete line
+            The unfinished tail stays in the reassembly buffer for the next call"""
+        if not self.is_connected() or self.is_reader_running():
+            return []
+        self.tracker.expire()
         
         try:
             # Check if data is available
-            if self.serial_connection.in_waiting > 0:
-                raw_line = self.serial_connection.readline()
-                decoded_line = raw_line.decode('utf-8', errors='ignore').strip()
-                
-                if decoded_line:
-                    self.last_raw_data = decoded_line
-                    self._parse_data(decoded_line) # If any data was read, parse it
-                    return True
+            waiting = self.serial_connection.in_waiting
+            if waiting == 0:
+                return []
             
-            return False
+            return self._consume_bytes(self.serial_connection.read(waiting))
             
         except serial.SerialException as e:
             print(f"Serial error while reading: {e}")
             self.is_connected_flag = False
-            return False
+            return []
         except Exception as e:
             print(f"Unexpected error while reading: {e}")
-            return False
+            return []
+    
+    def _consume_bytes(self, chunk: bytes) -> List[str]:
+        """Append raw bytes to the reassembly buffer and handle every complete line or binary frame in it
+            Text lines and binary frames (see telemetry/binary.py) may be mixed freely"""
+        buffer = self._rx_buffer
+        buffer += chunk
+        
+        lines = []
+        start = 0
+        sync = buffer.find(binary.SYNC)
+        # Decode straight out of the buffer, no intermediate bytes object per line or frame
+        with memoryview(buffer) as view:
+            while True:
+                end = buffer.find(b'\n', start)
+                
+                if sync >= 0 and (end < 0 or sync < end):
+                    # A binary frame starts before the next line break
+                    if sync + binary.FRAME_SIZE > len(buffer):
+                        start = sync  # Wait for the rest of the frame
+                        break
+                    
+                    self._skip_partial = False
+                    frame = binary.decode_frame(view, sync)
+                    if frame is not None:
+                        self._handle_frame(*frame)
+                    # A corrupt frame is dropped as a whole rather than leaking into the next line
+                    start = sync + binary.FRAME_SIZE
+                    sync = buffer.find(binary.SYNC, start)
+                    continue
+                
+                if end < 0:
+                    break
+                decoded_line = str(view[start:end], 'utf-8', 'ignore').strip()
+                start = end + 1
+                
+                if self._skip_partial:
+                    # The first line may be the tail of one sent before the port opened
+                    self._skip_partial = False
+                    if not self._is_complete_line(decoded_line):
+                        continue
+                
+                if decoded_line:
+                    self._handle_line(decoded_line)
+                    lines.append(decoded_line)
+        
+        # Drop the consumed data once, keeping only the partial tail
+        if start:
+            del buffer[:start]
+        if len(buffer) > MAX_LINE_LENGTH:
+            buffer.clear()
+        
+        return lines
+    
+    def _is_complete_line(self, decoded_line: str) -> bool:
+        """Whether a line is known to be whole: the boot banner, an acknowledgement or a valid frame"""
+        if decoded_line == BANNER or decoded_line.startswith(("Received command: ", ">>> ")):
+            return True
+        return self._frame_parser is not None and self._frame_parser(decoded_line) is not None
+    
+    def _handle_frame(self, seq: int, millis: int, values: Dict[str, int]) -> None:
+        """Record a decoded binary frame and put its values in the cache"""
+        self.telemetry_mode = "binary"
+        self._ready.set()
+        self.last_frame_seq = seq
+        self._update_cache(values)
+    
+    def _handle_line(self, decoded_line: str) -> None:
+        """Record a received line and parse it into the cache (command acknowledgements are not telemetry)"""
+        self.last_raw_data = decoded_line
+        self.line_queue.append(decoded_line)
+        if decoded_line == BANNER:
+            self._ready.set()
+        if not self.tracker.on_line(decoded_line):
+            self._parse_data(decoded_line)
     
     def _parse_data(self, data_line: str) -> None:
         """Parse incoming data and update the cache
             Example format: label1: value1, label2: value2
             Example input data: temp: 26, humidity: 10"""
-        try:
-            # Parse "label: value" pairs separated by commas
-            if ':' in data_line:
-                pairs = data_line.split(',')
-                for pair in pairs:
-                    if ':' in pair:
-                        label, value = pair.split(':', 1)
-                        label = label.strip()
-                        value = value.strip()
-                        
-                        # Try to convert to appropriate type
-                        try:
-                            # Try integer first
-                            if '.' not in value:
-                                self.data_cache[label] = int(value)
-                            else:
-                                # Try float
-                                self.data_cache[label] = float(value)
-                        except ValueError:
-                            # Keep as string if not a number
-                            self.data_cache[label] = value
-            
-        except Exception as e:
-            print(f"Error parsing data '{data_line}': {e}")
+        values = None
+        if self._frame_parser is not None:
+            values = self._frame_parser(data_line)
+            if values is not None:
+                self.telemetry_mode = "text"
+                self._ready.set()
+        if values is None:
+            values = parse_line(data_line)
+        
+        if values:
+            self._update_cache(values)
+    
+    def _update_cache(self, values: Dict[str, Union[int, float, str, None]]) -> None:
+        """Publish a new version of the cache
+            The cache is copied and swapped rather than updated in place, so a reader holding
+            a snapshot never sees a half-written frame and no lock is needed"""
+        previous = self.data_cache
+        cache = previous.copy()
+        cache.update(values)
+        self.data_cache = cache
+        self.update_count += 1
+        
+        if self.history is not None:
+            self.history.append(values)
+        if self.recorder is not None:
+            self.recorder.record(values)
+        if self.events.has_subscribers():
+            self.events.publish(previous, values, time.monotonic())
+    
+    def enable_history(self, capacity: int = HISTORY_CAPACITY) -> TelemetryHistory:
+        """Start recording every frame into a preallocated in-memory history (see telemetry/history.py)"""
+        if self.history is None:
+            self.history = TelemetryHistory.from_schema(self.schema or FINAL_INO_SCHEMA, capacity)
+        return self.history
     
     def get_value(self, label: str):
         """Get the latest reading for a specific label"""
@@ -135,35 +394,71 @@ class ArduinoController:
         """Get all current values"""
         return self.data_cache.copy()
     
+    def get_snapshot(self) -> Dict[str, Union[int, float, str, None]]:
+        """Get the latest published cache without copying it (treat it as read-only)"""
+        return self.data_cache
+    
+    def get_lines(self) -> List[str]:
+        """Drain the raw lines collected since the last call"""
+        lines = []
+        while self.line_queue:
+            lines.append(self.line_queue.popleft())
+        return lines
+    
     def get_last_raw_data(self) -> str:
         """Get the last raw data string received from Arduino"""
         return self.last_raw_data
     
     def write(self, command: str) -> bool:
         """Send a command/data to the Arduino"""
+        return self.write_batch([command])
+    
+    def write_batch(self, commands: List[str]) -> bool:
+        """Send several commands with a single write and flush"""
+        return self._write_commands(commands)[0]
+    
+    def send(self, command: str) -> Future:
+        """Send a command, the Future resolves with its CommandAck once the Arduino confirms it
+            Example: controller.send("LED_ALL_ON").result(timeout=3).rtt_ms"""
+        return self.send_batch([command])[0]
+    
+    def send_batch(self, commands: List[str]) -> List[Future]:
+        """Send several commands with a single write, one Future per command"""
+        return self._write_commands(commands)[1]
+    
+    def _write_commands(self, commands: List[str]) -> Tuple[bool, List[Future]]:
+        """Track, encode, write and flush commands; failed writes fail their Futures"""
+        tracked = [self.tracker.track(command) for command in commands]
+        futures = [future for _, future in tracked]
+        
         if not self.is_connected():
             print("Cannot write: Not connected to Arduino")
-            return False
+            for command_id, _ in tracked:
+                self.tracker.fail(command_id, ConnectionError("Not connected to Arduino"))
+            return False, futures
         
         try:
-            # Ensure command ends with newline
-            if not command.endswith('\n'):
-                command += '\n'
+            # Ensure every command ends with newline
+            data = "".join(command if command.endswith('\n') else command + '\n' for command in commands)
             
             # Encode and send
-            self.serial_connection.write(command.encode('utf-8'))
+            self.serial_connection.write(data.encode('utf-8'))
             self.serial_connection.flush()
             
-            print(f"Sent to Arduino: {command.strip()}")
-            return True
+            print(f"Sent to Arduino: {', '.join(command.strip() for command in commands)}")
+            return True, futures
             
         except serial.SerialException as e:
             print(f"Serial error while writing: {e}")
             self.is_connected_flag = False
-            return False
+            error: Exception = e
         except Exception as e:
             print(f"Unexpected error while writing: {e}")
-            return False
+            error = e
+        
+        for command_id, _ in tracked:
+            self.tracker.fail(command_id, error)
+        return False, futures
     
     def __del__(self):
         """Cleanup: ensure serial connection is closed."""
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Tuple
+import customtkinter as ctk
+from PIL import Image
+from startup_profiler import IMAGE, profiler
+
+
+# Asset cache settings
+CACHE_DIR = "database/image_cache"  # Resized variants of the images, safe to delete
+DEFAULT_MODE = "RGBA"
+MAX_SCALING = 2.0  # CTkImage sources are kept sharp up to this window scaling (200 %)
+PNG_COMPRESS_LEVEL = 1  # Fast to write, still a fraction of the raw pixels
+
+Key = Tuple[str, Tuple[int, int], str, float]  # (path, size, mode, scale)
+
+
+class AssetCache:
+    """Process-wide cache of the images shown by the GUI, keyed by (path, size, mode)
+        Every image is decoded and resized once per process and every frame or dialog asking
+        for the same key gets the same CTkImage. CTkImage scales its source to the window
+        scaling itself, so its source is kept at up to MAX_SCALING times the logical size (never
+        above the file's own resolution) and stays sharp on high-DPI screens. Downsized variants
+        are also kept in cache_dir as PNG files named after the source's mtime, so later launches
+        read them back without resampling the full-size source; editing the source makes a new one"""
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0  # Served from memory
+        self.disk_hits = 0  # Read back from a stored variant
+        self.misses = 0  # Decoded and resized from the source
+        self._images: Dict[Key, Image.Image] = {}
+        self._ctk_images: Dict[Key, ctk.CTkImage] = {}
+        self._lock = threading.Lock()
+
+    def ctk_image(self, path: str, size: Tuple[int, int], mode: str = DEFAULT_MODE) -> ctk.CTkImage:
+        """The shared CTkImage of an image file at size (width, height) in logical pixels
+            Example: assets.ctk_image("assets/user_icon.png", (34, 34))"""
+        key = (os.path.normpath(path), tuple(size), mode, MAX_SCALING)
+        with self._lock:
+            image = self._ctk_images.get(key)
+            if image is None:
+                image = self._ctk_images[key] = ctk.CTkImage(self._image(key), size=key[1])
+        return image
+
+    def image(self, path: str, size: Tuple[int, int], mode: str = DEFAULT_MODE) -> Image.Image:
+        """The decoded image at exactly size, shared: copy it before drawing on it"""
+        with self._lock:
+            return self._image((os.path.normpath(path), tuple(size), mode, 1.0))
+
+    def clear(self) -> None:
+        """Forget the images held in memory, the stored variants stay"""
+        with self._lock:
+            self._images.clear()
+            self._ctk_images.clear()
+
+    def _image(self, key: Key) -> Image.Image:
+        """Memory, then the stored variant, then the source; holding the lock"""
+        image = self._images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        path, size, mode, scale = key
+        variant = self._variant_path(key, os.stat(path).st_mtime_ns)
+        try:
+            with profiler.span(f"read {os.path.basename(variant)}", IMAGE):
+                with Image.open(variant) as stored:
+                    image = stored.convert(mode)
+            self.disk_hits += 1
+        except (OSError, ValueError):
+            # No variant yet (or a truncated one, or the source needed no resizing)
+            with profiler.span(f"decode {path} at {size[0]}x{size[1]} x{scale:g}", IMAGE):
+                with Image.open(path) as source:
+                    image = source.convert(mode)
+                target = self._target_size(image.size, size, scale)
+                resized = image.size != target
+                if resized:
+                    image = image.resize(target, Image.LANCZOS)
+            self.misses += 1
+            if resized:
+                # A variant at the source's own size would be no faster to read than the source
+                self._store(key, variant, image)
+
+        self._images[key] = image
+        return image
+
+    @staticmethod
+    def _target_size(source: Tuple[int, int], size: Tuple[int, int], scale: float) -> Tuple[int, int]:
+        """size times scale, or less if the source has fewer pixels (but never below size)"""
+        factor = max(1.0, min(scale, source[0] / size[0], source[1] / size[1]))
+        return round(size[0] * factor), round(size[1] * factor)
+
+    def _variant_path(self, key: Key, mtime_ns: int) -> str:
+        return os.path.join(self.cache_dir, self._variant_prefix(key) + f"{mtime_ns}.png")
+
+    @staticmethod
+    def _variant_prefix(key: Key) -> str:
+        """Start of the names of every variant of a key, e.g. "logo-1a2b3c4d-120x120-RGBA-2x-" """
+        path, (width, height), mode, scale = key
+        stem = os.path.splitext(os.path.basename(path))[0]
+        digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]  # Same name in two folders
+        return f"{stem}-{digest}-{width}x{height}-{mode}-{scale:g}x-"
+
+    def _store(self, key: Key, variant: str, image: Image.Image) -> None:
+        """Write a variant (atomically) and delete the ones made from older versions of the source"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary = variant + ".tmp"
+            image.save(temporary, "PNG", compress_level=PNG_COMPRESS_LEVEL)
+            os.replace(temporary, variant)
+
+            prefix = self._variant_prefix(key)
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix) and name != os.path.basename(variant):
+                    os.remove(os.path.join(self.cache_dir, name))
+        except OSError as e:
+            # The cache is only an optimisation, a read-only folder just means decoding next time
+            print(f"Could not store the resized image {variant}: {e}")
+
+
+# The cache shared by every frame
+assets = AssetCache()
@@ -1,47 +1,106 @@
+import itertools
 import os
+import sys
+import time
+from authentication.sqlite_store import SQLITE_DB, SQLiteUserStore
 from authentication.user import User
 
 
+# User store backends
+TEXT = "text"      # user.txt, parsed into memory
+SQLITE = "sqlite"  # An SQLiteUserStore (see authentication/sqlite_store.py)
+
+# User store settings
+TEXT_DB = "database/user.txt"
+USER_BACKEND = TEXT  # Switch to SQLITE after importing user.txt with python -m authentication.sqlite_store
+STAT_INTERVAL = 1.0  # seconds, the files are checked for changes at most this often
+
+
 class PermissionManager:
-    def __init__(self, db="database/user.txt", profile_img_dir="database/user_profile_img"):
+    """Users of the "database" (one "name, password" line each), indexed by name in memory
+        The file is parsed once, and again only when its mtime or size (or the profile picture
+        folder) changes, checked at most every STAT_INTERVAL, so a login is a dict lookup.
+        With backend=SQLITE the users are read from an SQLiteUserStore instead; db defaults
+        to the backend's file (TEXT_DB or SQLITE_DB)"""
+    def __init__(self, db=None, profile_img_dir="database/user_profile_img", backend=USER_BACKEND):
+        if backend not in (TEXT, SQLITE):
+            raise ValueError(f"Unknown user store backend '{backend}'")
+        if db is None:
+            db = SQLITE_DB if backend == SQLITE else TEXT_DB
         self.db = db
+        self.backend = backend
         self.profile_img_dir = profile_img_dir
+        self.sqlite = SQLiteUserStore(db) if backend == SQLITE else None
+        print(f"User store: {backend} ({db})", file=sys.stderr)  # Kept off stdout, which tools parse
+        self._users = {}  # Username -> User, in file order
+        self._signature = None  # (mtime, size) of the files the users were loaded from
+        self._checked = None  # time.monotonic() of the last check
 
     def authenticator(self, name, password):
-        """Reads the "database" to find any matching username and password"""
-        with open(self.db, "r") as users:
-            for user in users:
-                if [name, password] == user.strip().split(", "):
-                    return True
+        """Check a username and password against the "database" """
+        user = self.get_user(name)
+        return user is not None and user.password == password
     
     def get_all_users(self):
         """Returns a list of all usernames from the database"""
-        usernames = []
-        with open(self.db, "r") as users:
-            for user in users:
-                username = user.strip().split(", ")[0]
-                usernames.append(username)
-        return usernames
+        if self.sqlite is not None:
+            return self.sqlite.usernames()
+        return list(self._get_users())
     
-    def get_user_objects(self):
-        """Returns a list of User objects with profile pictures"""
-        user_objects = []
-        with open(self.db, "r") as users:
-            for idx, user in enumerate(users, 1):
-                parts = user.strip().split(", ")
-                username = parts[0]
-                password = parts[1]
-                
-                # Try to find profile picture
-                profile_pic = self._find_profile_pic(username, idx)
-                
-                user_obj = User(username, password, profile_pic)
-                user_objects.append(user_obj)
+    def get_user_objects(self, offset=0, limit=None):
+        """Returns a list of User objects with profile pictures, limit of them from offset on if given"""
+        if self.sqlite is not None:
+            return self.sqlite.users(offset, limit)
+        stop = None if limit is None else offset + limit
+        return list(itertools.islice(self._get_users().values(), offset, stop))
+    
+    def get_user(self, name):
+        """The User called name, or None"""
+        if self.sqlite is not None:
+            return self.sqlite.get_user(name)
+        return self._get_users().get(name)
+    
+    def _get_users(self):
+        """The users, reloaded first if the files changed since the last check"""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < STAT_INTERVAL:
+            return self._users
+        
+        signature = (self._stat(self.db), self._stat(self.profile_img_dir))
+        if signature != self._signature:
+            self._users = self._load()
+            self._signature = signature
+        self._checked = now
+        return self._users
+    
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _load(self):
+        """Parse the whole file into a new dict (swapped in whole, readers never see it half built)"""
+        try:
+            pictures = set(os.listdir(self.profile_img_dir))
+        except OSError:
+            pictures = set()
         
-        return user_objects
+        users = {}
+        with open(self.db, "r") as lines:
+            for idx, line in enumerate(lines, 1):
+                parts = line.strip().split(", ")
+                if len(parts) < 2 or parts[0] in users:
+                    continue  # Blank line, or a name already taken by an earlier line
+                username, password = parts[0], parts[1]
+                users[username] = User(username, password, self._find_profile_pic(username, idx, pictures))
+        return users
     
-    def _find_profile_pic(self, username, user_index):
-        """Find profile picture for a user. Returns path or None."""
+    def _find_profile_pic(self, username, user_index, pictures=None):
+        """Find profile picture for a user. Returns path or None.
+            pictures is the content of the profile picture folder, to look it up without I/O"""
         # Try different naming patterns
         patterns = [
             f"user_{user_index}.png",
@@ -51,6 +110,10 @@ class PermissionManager:
         ]
         
         for pattern in patterns:
+            if pictures is not None:
+                if pattern in pictures:
+                    return os.path.join(self.profile_img_dir, pattern)
+                continue
             img_path = os.path.join(self.profile_img_dir, pattern)
             if os.path.exists(img_path):
                 return img_path
@@ -0,0 +1,88 @@
+import sqlite3
+import sys
+import threading
+from typing import Iterable, List, Optional
+from authentication.user import User
+
+
+# SQLite settings
+SQLITE_DB = "database/users.db"  # Passwords are stored as in user.txt, keep it out of git
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    profile_pic TEXT
+)
+"""
+
+
+class SQLiteUserStore:
+    """Users in an SQLite database: one row per user with the path of their profile picture
+        The UNIQUE constraint indexes the names, so a lookup is one B-tree search, and pages of
+        users (in insertion order) are read with LIMIT / OFFSET instead of loading everyone"""
+    def __init__(self, path: str = SQLITE_DB):
+        self.path = path
+        # The GUI and the importer may use it from different threads, calls are serialised
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def get_user(self, name: str) -> Optional[User]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT name, password, profile_pic FROM users WHERE name = ?", (name,)
+            ).fetchone()
+        return User(*row) if row is not None else None
+
+    def users(self, offset: int = 0, limit: Optional[int] = None) -> List[User]:
+        """A page of users in insertion order, every user from offset on if limit is None"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT name, password, profile_pic FROM users ORDER BY id LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return [User(*row) for row in rows]
+
+    def usernames(self) -> List[str]:
+        with self._lock:
+            return [name for name, in self._connection.execute("SELECT name FROM users ORDER BY id")]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def add_users(self, users: Iterable[User]) -> int:
+        """Insert users in one transaction, names already present are skipped; returns the number inserted"""
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO users (name, password, profile_pic) VALUES (?, ?, ?)",
+                ((user.name, user.password, user.profile_pic) for user in users)
+            )
+            return self._connection.total_changes - before
+
+
+def import_user_txt(text_db: str = "database/user.txt", sqlite_db: str = SQLITE_DB,
+                    profile_img_dir: str = "database/user_profile_img") -> int:
+    """One-shot import of a user.txt file (and its profile pictures) into SQLite, returns the users added
+        Profile pictures are resolved the way the text backend does and stored in the rows"""
+    from authentication.perm_manager import PermissionManager
+    users = PermissionManager(text_db, profile_img_dir).get_user_objects()
+    store = SQLiteUserStore(sqlite_db)
+    try:
+        return store.add_users(users)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    # python -m authentication.sqlite_store [user.txt] [users.db] [profile picture folder]
+    added = import_user_txt(*sys.argv[1:4])
+    print(f"Imported {added} users, set USER_BACKEND = SQLITE in authentication/perm_manager.py to use them")
@@ -0,0 +1,49 @@
+"""Micro-benchmark for telemetry line parsing
+
+Run from the repository root:
+    python -m benchmarks.bench_parse
+"""
+import timeit
+from arduino_comm import ArduinoController, parse_line
+from telemetry.schema import FINAL_INO_SCHEMA
+
+
+# A frame exactly as printed by FINAL.ino, and a line only the generic parser understands
+FRAME_LINE = "F1: 1, F2: 0, F3: 1, In: 0, Out: 0, LDR: 2345, Rain: 0, Fire: 0"
+OTHER_LINE = "Received command: LED_ALL_ON"
+REPEAT = 5
+NUMBER = 50000
+
+
+def lines_per_second(func, line: str) -> float:
+    """Best of REPEAT runs of NUMBER calls"""
+    best = min(timeit.repeat(lambda: func(line), repeat=REPEAT, number=NUMBER))
+    return NUMBER / best
+
+
+def main():
+    frame_parser = FINAL_INO_SCHEMA.compile()
+    generic_controller = ArduinoController(schema=None)
+    schema_controller = ArduinoController()
+
+    # Both paths must agree on the values they produce
+    assert frame_parser(FRAME_LINE) == parse_line(FRAME_LINE)
+
+    results = [
+        ("parse_line (generic)", lines_per_second(parse_line, FRAME_LINE)),
+        ("compiled schema parser", lines_per_second(frame_parser, FRAME_LINE)),
+        ("_parse_data, generic only", lines_per_second(generic_controller._parse_data, FRAME_LINE)),
+        ("_parse_data, schema fast path", lines_per_second(schema_controller._parse_data, FRAME_LINE)),
+        ("_parse_data, fallback line", lines_per_second(schema_controller._parse_data, OTHER_LINE)),
+    ]
+
+    print(f"{'benchmark':<32}{'lines/sec':>14}")
+    print("-" * 46)
+    for name, rate in results:
+        print(f"{name:<32}{rate:>14,.0f}")
+    print(f"\nSpeed-up of the fast path: {results[1][1] / results[0][1]:.2f}x (parser), "
+          f"{results[3][1] / results[2][1]:.2f}x (controller)")
+
+
+if __name__ == "__main__":
+    main()
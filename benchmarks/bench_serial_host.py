@@ -0,0 +1,272 @@
+"""Benchmark suite for the serial host path
+
+Micro-benchmarks of the ArduinoController hot spots, then an end-to-end sweep against
+the virtual device (device_emulator.py) at increasing line rates. Results are printed
+and written as JSON so runs can be compared across commits.
+
+Run from the repository root:
+    python -m benchmarks.bench_serial_host
+    python -m benchmarks.bench_serial_host --rates 100 1000 --duration 1
+    python -m benchmarks.bench_serial_host --compare benchmarks/results/serial_host-abc1234.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import pty
+import subprocess
+import threading
+import time
+import timeit
+import tracemalloc
+import tty
+from typing import Dict, List, Optional, Tuple
+import serial
+from arduino_comm import ArduinoController
+from device_emulator import VirtualDevice
+
+
+FRAME_LINE = "F1: 1, F2: 0, F3: 1, In: 0, Out: 0, LDR: 2345, Rain: 0, Fire: 0"
+RATES = [100, 1000, 5000, 10000, 50000]  # lines per second offered by the device
+DURATION = 3.0  # seconds per rate
+MICRO_NUMBER = 20000
+RESULTS_DIR = "benchmarks/results"
+
+
+class CountingDevice(VirtualDevice):
+    """VirtualDevice that numbers its frames in the LDR field, so each update can be matched to its frame"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.auto_ldr = False
+        self.frame_number = 0
+
+    def _frame(self) -> bytes:
+        self.frame_number += 1
+        self.sensors["LDR"] = self.frame_number
+        return super()._frame()
+
+
+class InstrumentedController(ArduinoController):
+    """ArduinoController that timestamps every cache update and measures its reader thread's CPU"""
+    def __init__(self):
+        super().__init__()
+        self.updates: List[Tuple[object, float]] = []  # (LDR, time.monotonic()) of every update
+        self.reader_cpu = 0.0
+
+    def _update_cache(self, values):
+        super()._update_cache(values)
+        self.updates.append((values.get("LDR"), time.monotonic()))
+
+    def _reader_loop(self):
+        start = time.thread_time()
+        try:
+            super()._reader_loop()
+        finally:
+            self.reader_cpu = time.thread_time() - start
+
+
+def git_commit() -> str:
+    """Short hash of HEAD, or "unknown" outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def drain_fd(fd: int) -> None:
+    """Read and discard everything written to the other end of a pseudo terminal"""
+    try:
+        while os.read(fd, 65536):
+            pass
+    except OSError:
+        pass
+
+
+def per_call_us(func, number: int = MICRO_NUMBER) -> float:
+    """Best of 5 runs, in microseconds per call"""
+    return min(timeit.repeat(func, repeat=5, number=number)) / number * 1e6
+
+
+def peak_bytes_per_call(func, number: int = 1000) -> float:
+    """tracemalloc peak over the run divided by the calls, a proxy for allocations per line"""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(number):
+        func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (peak - baseline) / number
+
+
+def micro_benchmarks() -> Dict[str, Dict[str, float]]:
+    """Per-call cost of the controller hot spots, without any I/O wait"""
+    controller = ArduinoController()
+    burst = (FRAME_LINE + "\r\n").encode() * 100
+
+    # write() against a pseudo terminal drained by a thread, its print() goes to /dev/null
+    master_fd, slave_fd = pty.openpty()
+    tty.setraw(slave_fd)
+    drain = threading.Thread(target=drain_fd, args=(master_fd,), daemon=True)
+    drain.start()
+    writer = ArduinoController()
+    writer.serial_connection = serial.Serial(os.ttyname(slave_fd), timeout=0)
+    writer.is_connected_flag = True
+
+    results = {
+        "_parse_data": {
+            "us_per_line": per_call_us(lambda: controller._parse_data(FRAME_LINE)),
+            "peak_bytes_per_line": peak_bytes_per_call(lambda: controller._parse_data(FRAME_LINE)),
+        },
+        "read_data (100-line burst)": {
+            "us_per_line": per_call_us(lambda: controller._consume_bytes(burst), number=200) / 100,
+            "peak_bytes_per_line": peak_bytes_per_call(lambda: controller._consume_bytes(burst), number=20) / 100,
+        },
+        "get_all_values": {
+            "us_per_line": per_call_us(controller.get_all_values),
+            "peak_bytes_per_line": peak_bytes_per_call(controller.get_all_values),
+        },
+    }
+
+    # Nothing acknowledges the writes: drop each tracker entry so the run measures the write
+    # path, not a pending list growing by one command per call
+    acknowledged = ConnectionError("benchmark")
+
+    def write_line():
+        writer.write("LED_ALL_ON")
+        writer.tracker.fail_all(acknowledged)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["write"] = {
+            "us_per_line": per_call_us(write_line, number=2000),
+            "peak_bytes_per_line": peak_bytes_per_call(write_line),
+        }
+        writer.disconnect()
+    os.close(slave_fd)
+    os.close(master_fd)
+
+    # The popup's change detection lives with the GUI widgets, which need customtkinter
+    try:
+        from ctk_addons import changed_fields
+    except ImportError as e:
+        print(f"Skipping update_sensor_display change detection: {e}")
+    else:
+        values = controller.get_snapshot()
+        displayed = {label: str(value) for label, value in values.items()}
+        results["update_sensor_display (change detection)"] = {
+            "us_per_line": per_call_us(lambda: changed_fields(displayed, values)),
+            "peak_bytes_per_line": peak_bytes_per_call(lambda: changed_fields(displayed, values)),
+        }
+
+    return results
+
+
+def sweep_rate(rate: float, duration: float) -> Dict[str, Optional[float]]:
+    """Run the reader against the virtual device at one line rate"""
+    device = CountingDevice(frame_rate=rate, time_scale=0.0, seed=1)
+    send_times: Dict[int, float] = {}  # Frame number -> time its write started
+    lock = threading.Lock()
+
+    def on_frames_sent(count, sent_at):
+        with lock:
+            send_times.update((number, sent_at) for number in
+                              range(device.frame_number - count + 1, device.frame_number + 1))
+
+    controller = InstrumentedController()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        device.start()
+        controller.connect(device.port)  # Returns once the banner arrives
+
+        # Only count frames sent once the reader is running
+        device.on_frames_sent = on_frames_sent
+        controller.start_reader()
+        time.sleep(duration)
+        device.on_frames_sent = None
+        time.sleep(0.2)  # Let the reader drain what is in flight
+        controller.disconnect()
+        device.stop()
+
+    # Match every update to its frame by number, the backlog from connect() was not counted
+    with lock:
+        sent = dict(send_times)
+    latencies = sorted(updated_at - sent[number] for number, updated_at in controller.updates if number in sent)
+    if latencies and latencies[0] < 0:
+        print(f"Warning: {rate:g} lines/s has negative latencies down to {latencies[0] * 1000:.3f} ms")
+
+    return {
+        "offered_lines_per_s": len(sent) / duration,
+        "processed_lines_per_s": len(latencies) / duration,
+        "p50_latency_ms": None if not latencies else percentile(latencies, 0.50) * 1000,
+        "p99_latency_ms": None if not latencies else percentile(latencies, 0.99) * 1000,
+        "reader_cpu_us_per_line": controller.reader_cpu / len(latencies) * 1e6 if latencies else None,
+    }
+
+
+def compare(results: dict, baseline_path: str) -> None:
+    """Print the relative change of every number against an earlier results file"""
+    with open(baseline_path, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+
+    print(f"\nChange against {baseline_path} ({baseline.get('commit')}):")
+    for section in ("micro", "sweep"):
+        for name, metrics in results[section].items():
+            for metric, value in metrics.items():
+                old = baseline.get(section, {}).get(name, {}).get(metric)
+                if value is None or not old:
+                    continue
+                print(f"  {section}/{name}/{metric}: {old:.3f} -> {value:.3f} ({(value - old) / old:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serial host path")
+    parser.add_argument("--rates", type=float, nargs="+", default=RATES, help="line rates to sweep")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per rate")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/serial_host-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "micro": micro_benchmarks(),
+        "sweep": {},
+    }
+
+    print(f"{'micro-benchmark':<40}{'us/line':>10}{'peak B/line':>14}")
+    print("-" * 64)
+    for name, metrics in results["micro"].items():
+        print(f"{name:<40}{metrics['us_per_line']:>10.2f}{metrics['peak_bytes_per_line']:>14.1f}")
+
+    print(f"\n{'rate':>8}{'offered/s':>12}{'processed/s':>13}{'p50 ms':>9}{'p99 ms':>9}{'cpu us/line':>13}")
+    print("-" * 64)
+    for rate in args.rates:
+        sweep = sweep_rate(rate, args.duration)
+        results["sweep"][f"{rate:g}"] = sweep
+        print(f"{rate:>8g}{sweep['offered_lines_per_s']:>12.0f}{sweep['processed_lines_per_s']:>13.0f}"
+              + "".join(f"{value:>9.2f}" if value is not None else f"{'-':>9}"
+                        for value in (sweep["p50_latency_ms"], sweep["p99_latency_ms"]))
+              + (f"{sweep['reader_cpu_us_per_line']:>13.1f}" if sweep["reader_cpu_us_per_line"] else f"{'-':>13}"))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"serial_host-{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Cold-start benchmark of the GUI: time until the first screen is drawn
+
+Every run is a fresh interpreter, so imports and image decoding are measured cold.
+"eager" builds every frame before the first paint (as App did before frames were lazy),
+"lazy" builds only the user selection screen. Needs a display.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+
+RUNS = 5
+MODES = ("eager", "lazy")
+RESULT_TAG = "first-paint:"  # Starts the line the child prints its result on, anything else is ignored
+
+
+def first_paint(mode: str) -> None:
+    """Child process: build the app, draw the first screen and print the elapsed time"""
+    start = time.perf_counter()
+    import main
+
+    app = main.App(prewarm=False)
+    if mode == "eager":
+        for name in main.FRAMES:
+            app.get_frame(name)
+    app.update()
+    elapsed = time.perf_counter() - start
+    print(f"{RESULT_TAG} {elapsed:.6f} {int('serial' in sys.modules)}")
+    app.destroy()
+
+
+def measure(mode: str):
+    """Seconds to the first paint of every run, and whether pyserial was imported by then"""
+    times = []
+    serial_loaded = False
+    for _ in range(RUNS):
+        stdout = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", mode],
+                                capture_output=True, text=True, check=True).stdout
+        result = [line for line in stdout.splitlines() if line.startswith(RESULT_TAG)][-1]
+        _, elapsed, serial_imported = result.split()
+        times.append(float(elapsed))
+        serial_loaded = serial_imported == "1"
+    return times, serial_loaded
+
+
+def main():
+    results = {mode: measure(mode) for mode in MODES}
+
+    print(f"{'mode':<8}{'median ms':>12}{'min ms':>10}{'pyserial loaded':>18}")
+    print("-" * 48)
+    for mode, (times, serial_loaded) in results.items():
+        print(f"{mode:<8}{statistics.median(times) * 1000:>12.1f}{min(times) * 1000:>10.1f}"
+              f"{'yes' if serial_loaded else 'no':>18}")
+
+    ratio = statistics.median(results["lazy"][0]) / statistics.median(results["eager"][0])
+    print(f"\nLazy first paint takes {ratio:.0%} of the eager one (target: under 50%)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        first_paint(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,79 @@
+"""Benchmark of the user lookups at 100, 10k and 100k users
+
+Compares a linear scan of user.txt (how PermissionManager used to authenticate), the
+in-memory text backend and the SQLite backend, for a login and for the first page of
+users shown by the user selection screen.
+
+Run from the repository root:
+    python -m benchmarks.bench_users
+"""
+import os
+import tempfile
+import time
+import timeit
+from authentication.perm_manager import SQLITE, PermissionManager
+from authentication.sqlite_store import import_user_txt
+
+
+SIZES = (100, 10_000, 100_000)
+REPEAT = 5
+PAGE = 3  # Users shown by the user selection screen
+
+
+def linear_scan(db: str, name: str, password: str) -> bool:
+    """A login the way it used to be done: read and split the whole file"""
+    with open(db, "r") as users:
+        for user in users:
+            if [name, password] == user.strip().split(", "):
+                return True
+    return False
+
+
+def per_call_us(func, number: int) -> float:
+    """Best of REPEAT runs, in microseconds per call"""
+    return min(timeit.repeat(func, repeat=REPEAT, number=number)) / number * 1e6
+
+
+def main():
+    print(f"{'users':>8}  {'benchmark':<34}{'us/call':>12}")
+    print("-" * 56)
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            text_db = os.path.join(directory, "user.txt")
+            sqlite_db = os.path.join(directory, "users.db")
+            with open(text_db, "w") as file:
+                file.writelines(f"user{i}, password{i}\n" for i in range(size))
+
+            start = time.perf_counter()
+            import_user_txt(text_db, sqlite_db, directory)
+            import_ms = (time.perf_counter() - start) * 1000
+
+            text_users = PermissionManager(text_db, directory)
+            start = time.perf_counter()
+            text_users.get_all_users()
+            load_ms = (time.perf_counter() - start) * 1000
+            sqlite_users = PermissionManager(sqlite_db, directory, SQLITE)
+
+            # The last user, the worst case of the scan
+            name, password = f"user{size - 1}", f"password{size - 1}"
+            assert linear_scan(text_db, name, password)
+            assert text_users.authenticator(name, password) and sqlite_users.authenticator(name, password)
+            number = max(1, 100_000 // size)
+            results = [
+                ("login, linear scan of user.txt", per_call_us(lambda: linear_scan(text_db, name, password), number)),
+                ("login, in-memory text backend", per_call_us(lambda: text_users.authenticator(name, password), 10_000)),
+                ("login, SQLite backend", per_call_us(lambda: sqlite_users.authenticator(name, password), 10_000)),
+                (f"first {PAGE} users, text backend", per_call_us(lambda: text_users.get_user_objects(limit=PAGE), 10_000)),
+                (f"first {PAGE} users, SQLite backend", per_call_us(lambda: sqlite_users.get_user_objects(limit=PAGE), 10_000)),
+            ]
+            sqlite_users.sqlite.close()
+
+            for label, us in results:
+                print(f"{size:>8}  {label:<34}{us:>12.2f}")
+            print(f"{size:>8}  {'text backend first load (ms)':<34}{load_ms:>12.2f}")
+            print(f"{size:>8}  {'import into SQLite (ms)':<34}{import_ms:>12.2f}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from arduino_comm import ArduinoController
+from command_tracker import BUSY_TIMES
+
+
+# While the firmware is busy (see BUSY_TIMES) commands wait on the host where they can still be coalesced
+MAX_BATCH = 16  # Commands sent with a single write at most
+# One-off actions, not replayed after a reconnect (see replay). The roof motor runs blind for 7.5 s
+# (FINAL.ino has no position sensing), so replaying it after a USB blip could drive an already placed roof
+TRANSIENT_ACTUATORS = {"ELEVATOR_FLOOR", "RAIN_SHELTER"}
+
+
+def actuator_of(command: str) -> str:
+    """Actuator a command drives: the command without its last word
+        Example: "BARRIER_IN_OPEN" -> "BARRIER_IN", "ELEVATOR_FLOOR_2" -> "ELEVATOR_FLOOR" """
+    return command.rsplit("_", 1)[0]
+
+
+class CommandQueue:
+    """Non-blocking outbound command queue for an ArduinoController
+        put() returns at once, a writer thread does the serial I/O. A command replaces any pending
+        command for the same actuator, so only the last floor / barrier state / ... is sent.
+        Pending commands are written together, but never past one that blocks the firmware"""
+    def __init__(self, controller: ArduinoController):
+        self.controller = controller
+        self.sent = 0  # Commands written to the port
+        self.coalesced = 0  # Commands replaced by a newer one before being sent
+        self.failed = 0  # Commands lost to a write error
+
+        self._pending: "OrderedDict[str, str]" = OrderedDict()  # actuator -> command, oldest first
+        self.desired: "OrderedDict[str, str]" = OrderedDict()  # actuator -> last command asked for
+        self._condition = threading.Condition()
+        self._busy_until = 0.0  # monotonic time the firmware is expected to read commands again
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._writer_loop, name="CommandQueue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the writer thread, pending commands are dropped"""
+        with self._condition:
+            self._stop = True
+            self._pending.clear()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def put(self, command: str) -> int:
+        """Queue a command, replacing a pending one for the same actuator. Returns the queue depth"""
+        actuator = actuator_of(command)
+        with self._condition:
+            if self._pending.pop(actuator, None) is not None:
+                self.coalesced += 1
+            self._pending[actuator] = command
+            if actuator not in TRANSIENT_ACTUATORS:
+                self.desired.pop(actuator, None)
+                self.desired[actuator] = command
+            self._condition.notify()
+            return len(self._pending)
+
+    def replay(self) -> int:
+        """Queue the last command of every actuator again, e.g. after the board rebooted
+            Returns the number of commands queued"""
+        with self._condition:
+            commands = list(self.desired.values())
+            self._busy_until = 0.0  # A rebooted board is not busy
+        for command in commands:
+            self.put(command)
+        return len(commands)
+
+    def depth(self) -> int:
+        """Number of commands waiting to be sent"""
+        return len(self._pending)
+
+    def pending(self) -> List[str]:
+        """Commands waiting to be sent, in sending order"""
+        with self._condition:
+            return list(self._pending.values())
+
+    def busy_for(self) -> float:
+        """Seconds until the firmware is expected to accept commands again"""
+        return max(0.0, self._busy_until - time.monotonic())
+
+    def _next_batch(self) -> Optional[Tuple[List[str], float]]:
+        """Wait until commands can be sent, then take them: (commands, seconds the firmware will be busy)"""
+        with self._condition:
+            while not self._stop:
+                wait = self._busy_until - time.monotonic()
+                if self._pending and wait <= 0:
+                    break
+                self._condition.wait(wait if wait > 0 else None)
+            if self._stop:
+                return None
+
+            batch = []
+            busy = 0.0
+            while self._pending and len(batch) < MAX_BATCH and busy == 0.0:
+                _, command = self._pending.popitem(last=False)
+                batch.append(command)
+                busy = BUSY_TIMES.get(command, 0.0)
+            return batch, busy
+
+    def _writer_loop(self) -> None:
+        """Body of the writer thread"""
+        while True:
+            taken = self._next_batch()
+            if taken is None:
+                return
+            batch, busy = taken
+
+            if self.controller.write_batch(batch):
+                self.sent += len(batch)
+                self._busy_until = time.monotonic() + busy
+            else:
+                self.failed += len(batch)
@@ -0,0 +1,241 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+
+# Acknowledgement settings
+ACK_TIMEOUT = 2.0  # seconds, on top of the time the firmware is busy with earlier commands
+
+# Seconds FINAL.ino stays blocked after each command (roof motor, elevator trip), estimated from
+# the firmware's delays
+BUSY_TIMES = {
+    "RAIN_SHELTER_ON": 7.5,
+    "RAIN_SHELTER_OFF": 7.5,
+    "ELEVATOR_FLOOR_0": 0.5,
+    "ELEVATOR_FLOOR_1": 7.0,
+    "ELEVATOR_FLOOR_2": 9.0,
+}
+
+# Lines processSerialCommand() prints for each command: an echo first, then a confirmation
+ECHO_PREFIX = "Received command: "
+REPLY_PREFIX = ">>> "
+UNKNOWN_PREFIX = ">>> Unknown command: "
+CONFIRMATIONS = {
+    "MODE_AUTO": ">>> Switched to AUTO mode",
+    "MODE_MANUAL": ">>> Switched to MANUAL mode",
+    "BARRIER_IN_OPEN": ">>> BARRIER IN: OPEN",
+    "BARRIER_IN_CLOSE": ">>> BARRIER IN: CLOSED",
+    "BARRIER_OUT_OPEN": ">>> BARRIER OUT: OPEN",
+    "BARRIER_OUT_CLOSE": ">>> BARRIER OUT: CLOSED",
+    "ELEVATOR_FLOOR_0": ">>> ELEVATOR: Moving to GROUND floor",
+    "ELEVATOR_FLOOR_1": ">>> ELEVATOR: Moving to floor 1",
+    "ELEVATOR_FLOOR_2": ">>> ELEVATOR: Moving to floor 2",
+    "LED_ALL_ON": ">>> LEDs: ALL ON",
+    "LED_ALL_OFF": ">>> LEDs: ALL OFF",
+    "RAIN_SHELTER_ON": ">>> RAIN SHELTER: CLOSED (deployed)",
+    "RAIN_SHELTER_OFF": ">>> RAIN SHELTER: OPEN (retracted)",
+    "TELEMETRY_BINARY": ">>> TELEMETRY: BINARY",
+    "TELEMETRY_TEXT": ">>> TELEMETRY: TEXT",
+}
+
+# Upper bounds of the latency histogram buckets, in milliseconds (one more bucket catches the rest)
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000)
+
+
+class CommandTimeout(Exception):
+    """No acknowledgement arrived in time"""
+
+
+class CommandAck(NamedTuple):
+    """Result of an acknowledged command, times are time.monotonic() values"""
+    command_id: int
+    command: str
+    reply: str  # Confirmation line, or the "Unknown command" reply
+    sent_at: float
+    echoed_at: Optional[float]  # When "Received command: ..." arrived
+    confirmed_at: float
+
+    @property
+    def known(self) -> bool:
+        """False if the firmware did not recognise the command"""
+        return not self.reply.startswith(UNKNOWN_PREFIX)
+
+    @property
+    def rtt_ms(self) -> float:
+        """Round trip from the write to the confirmation"""
+        return (self.confirmed_at - self.sent_at) * 1000
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of latencies in milliseconds"""
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency_ms: float) -> None:
+        self.counts[bisect_left(self.buckets, latency_ms)] += 1
+        self.count += 1
+        self.total += latency_ms
+        self.max = max(self.max, latency_ms)
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of the samples (max for the last bucket)"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "mean_ms": self.mean(),
+            "p50_ms": self.percentile(0.50),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max if self.count else None,
+        }
+
+
+class _Pending:
+    """A command written to the port and not acknowledged yet"""
+    __slots__ = ("command_id", "command", "sent_at", "deadline", "echoed_at", "future")
+
+    def __init__(self, command_id: int, command: str, sent_at: float, deadline: float):
+        self.command_id = command_id
+        self.command = command
+        self.sent_at = sent_at
+        self.deadline = deadline
+        self.echoed_at: Optional[float] = None
+        # Running from the start: the command is on the wire, so cancel() returns False and the
+        # tracker can always resolve it (resolving a cancelled Future would raise on the reader thread)
+        self.future: Future = Future()
+        self.future.set_running_or_notify_cancel()
+
+
+class CommandTracker:
+    """Matches the firmware's acknowledgement lines to the commands that were sent
+        track() gives each command an id and a Future, resolved with a CommandAck when its
+        confirmation line arrives or failed with CommandTimeout. The firmware handles commands
+        one at a time and in order, so the oldest echoed command owns the next confirmation.
+        Round-trip latencies are kept in one histogram per command"""
+    def __init__(self, timeout: float = ACK_TIMEOUT):
+        self.timeout = timeout
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.confirmed = 0
+        self.timeouts = 0
+
+        self._lock = threading.Lock()
+        self._pending: Deque[_Pending] = deque()  # Oldest first
+        self._busy = 0.0  # Sum of BUSY_TIMES over the pending commands, kept up to date rather than re-summed
+        self._next_id = 1
+
+    def track(self, command: str) -> Tuple[int, Future]:
+        """Register a command about to be written, returns its id and Future
+            Call it before writing so a fast acknowledgement cannot arrive first"""
+        command = command.strip()
+        now = time.monotonic()
+        with self._lock:
+            # Commands ahead of this one may keep the firmware busy before it reads it
+            busy = BUSY_TIMES.get(command, 0.0)
+            pending = _Pending(self._next_id, command, now, now + self._busy + busy + self.timeout)
+            self._next_id += 1
+            self._pending.append(pending)
+            self._busy += busy
+        return pending.command_id, pending.future
+
+    def fail(self, command_id: int, error: Exception) -> None:
+        """Give up on a command, e.g. because writing it failed"""
+        with self._lock:
+            for pending in self._pending:
+                if pending.command_id == command_id:
+                    self._remove(pending)
+                    break
+            else:
+                return
+        pending.future.set_exception(error)
+
+    def fail_all(self, error: Exception) -> None:
+        """Give up on every command, e.g. on disconnect"""
+        with self._lock:
+            pending_commands = list(self._pending)
+            self._pending.clear()
+            self._busy = 0.0
+        for pending in pending_commands:
+            pending.future.set_exception(error)
+
+    def _remove(self, pending: _Pending) -> None:
+        """Drop a pending command, holding the lock"""
+        self._pending.remove(pending)
+        self._busy = self._busy - BUSY_TIMES.get(pending.command, 0.0) if self._pending else 0.0
+
+    def pending_count(self) -> int:
+        """Commands sent and not acknowledged yet"""
+        return len(self._pending)
+
+    def on_line(self, line: str) -> bool:
+        """Feed a received line, returns True if it was an acknowledgement (not telemetry)"""
+        if line.startswith(ECHO_PREFIX):
+            self._on_echo(line[len(ECHO_PREFIX):].strip())
+            return True
+        if line.startswith(REPLY_PREFIX):
+            self._on_reply(line)
+            return True
+        return False
+
+    def _on_echo(self, command: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for pending in self._pending:
+                if pending.echoed_at is None and pending.command == command:
+                    pending.echoed_at = now
+                    return
+
+    def _on_reply(self, line: str) -> None:
+        """Resolve the command a confirmation belongs to; other ">>>" lines (roof status) are ignored"""
+        now = time.monotonic()
+        with self._lock:
+            for pending in self._pending:
+                if pending.echoed_at is None:
+                    continue
+                if line == CONFIRMATIONS.get(pending.command) or line.startswith(UNKNOWN_PREFIX):
+                    self._remove(pending)
+                    break
+            else:
+                return
+
+            ack = CommandAck(pending.command_id, pending.command, line, pending.sent_at, pending.echoed_at, now)
+            self.histograms.setdefault(pending.command, LatencyHistogram()).add(ack.rtt_ms)
+            self.confirmed += 1
+        pending.future.set_result(ack)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Fail the commands whose deadline passed, returns how many"""
+        if not self._pending:
+            return 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [pending for pending in self._pending if pending.deadline <= now]
+            for pending in expired:
+                self._remove(pending)
+            self.timeouts += len(expired)
+        for pending in expired:
+            pending.future.set_exception(CommandTimeout(f"No acknowledgement for {pending.command}"))
+        return len(expired)
+
+    def latency_report(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Round-trip latency summary per command"""
+        with self._lock:
+            return {command: histogram.summary() for command, histogram in sorted(self.histograms.items())}
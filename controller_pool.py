@@ -0,0 +1,219 @@
+import selectors
+import socket
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Union
+import serial
+from arduino_comm import BAUDRATE, READY_TIMEOUT, ArduinoController
+from telemetry.schema import FINAL_INO_SCHEMA, TelemetrySchema
+
+
+# Pool settings
+SELECT_TIMEOUT = 0.1  # seconds, longest sleep of the I/O loop (acknowledgement timeouts are checked this often)
+POLL_INTERVAL = 0.01  # seconds, for ports without a pollable file descriptor (Windows)
+
+TelemetryCallback = Callable[[str, Dict[str, Union[int, float, str, None]]], None]
+
+
+class PooledController(ArduinoController):
+    """ArduinoController of one lot, read by the pool's I/O loop instead of its own thread"""
+    def __init__(self, lot_id: str, pool: "ControllerPool", schema: TelemetrySchema = FINAL_INO_SCHEMA):
+        super().__init__(schema)
+        self.lot_id = lot_id
+        self.pool = pool
+
+    def _update_cache(self, values):
+        super()._update_cache(values)
+        self.pool._route(self.lot_id, values)
+
+
+class ControllerPool:
+    """Many parking lots, one ESP32 each, served by a single I/O thread
+        Every port is registered with one selectors loop, so dozens of links cost one thread
+        and a wakeup per burst of data instead of a reader thread per port. Telemetry is routed
+        by lot id to subscribers, commands go through send(lot_id, command).
+        Ports without a pollable file descriptor (Windows) are polled every POLL_INTERVAL"""
+    def __init__(self, schema: TelemetrySchema = FINAL_INO_SCHEMA):
+        self.schema = schema
+        self._controllers: Dict[str, PooledController] = {}
+        self._subscribers: Dict[Optional[str], List[TelemetryCallback]] = {}
+        self._lock = threading.Lock()  # Guards the controllers and subscribers
+
+        self._selector = selectors.DefaultSelector()
+        self._polled: Dict[str, PooledController] = {}  # Lots without a pollable file descriptor
+        self._pending_changes: List[Callable[[], None]] = []  # Selector updates for the I/O thread
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ, None)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ControllerPool":
+        """Start the I/O thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._io_loop, name="ControllerPool", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the I/O thread and disconnect every lot"""
+        self._stop.set()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for lot_id in self.lots():
+            self.remove(lot_id)
+
+    def add(self, lot_id: str, port: str, baudrate: int = BAUDRATE, ready_timeout: float = READY_TIMEOUT) -> bool:
+        """Connect a lot's board and start serving it, blocks until it is ready (see ArduinoController.connect)"""
+        controller = PooledController(lot_id, self, self.schema)
+        if not controller.connect(port, baudrate, ready_timeout):
+            return False
+
+        # Unregister a replaced board before its port closes, or the OS may hand its fd number to
+        # another port while the selector still holds it
+        self.remove(lot_id)
+        with self._lock:
+            self._controllers[lot_id] = controller
+        self._change(lambda: self._register(controller))
+        return True
+
+    def remove(self, lot_id: str) -> None:
+        """Stop serving a lot and close its port"""
+        with self._lock:
+            controller = self._controllers.pop(lot_id, None)
+        if controller is None:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            done = threading.Event()
+            self._change(lambda: (self._unregister(controller), done.set()))
+            done.wait()
+        controller.disconnect()
+
+    def lots(self) -> List[str]:
+        return list(self._controllers)
+
+    def controller(self, lot_id: str) -> ArduinoController:
+        return self._controllers[lot_id]
+
+    def get_values(self, lot_id: str) -> Dict[str, Union[int, float, str, None]]:
+        """Latest telemetry of a lot (the shared snapshot, do not modify it)"""
+        return self._controllers[lot_id].get_snapshot()
+
+    def state(self, lot_id: str) -> Dict[str, Union[bool, int, str, None]]:
+        """Link state of a lot"""
+        controller = self._controllers[lot_id]
+        return {
+            "connected": controller.is_connected(),
+            "ready": controller.ready,
+            "telemetry_mode": controller.telemetry_mode,
+            "updates": controller.update_count,
+            "unconfirmed_commands": controller.tracker.pending_count(),
+        }
+
+    def send(self, lot_id: str, command: str) -> Future:
+        """Send a command to a lot, the Future resolves with its acknowledgement"""
+        return self._controllers[lot_id].send(command)
+
+    def subscribe(self, callback: TelemetryCallback, lot_id: Optional[str] = None) -> None:
+        """Call callback(lot_id, values) for every frame of a lot, or of every lot if lot_id is None
+            Callbacks run on the I/O thread and must return quickly"""
+        with self._lock:
+            self._subscribers.setdefault(lot_id, []).append(callback)
+
+    def unsubscribe(self, callback: TelemetryCallback, lot_id: Optional[str] = None) -> None:
+        with self._lock:
+            if callback in self._subscribers.get(lot_id, []):
+                self._subscribers[lot_id].remove(callback)
+
+    def _route(self, lot_id: str, values: Dict[str, Union[int, float, str, None]]) -> None:
+        for callback in (*self._subscribers.get(lot_id, ()), *self._subscribers.get(None, ())):
+            try:
+                callback(lot_id, values)
+            except Exception as e:
+                # A faulty subscriber must not take the I/O thread (and every lot) down
+                print(f"Error in telemetry subscriber of lot {lot_id}: {type(e).__name__}: {e}")
+
+    def _change(self, change: Callable[[], None]) -> None:
+        """Run a selector update on the I/O thread (or here if it is not running)"""
+        if self._thread is None or not self._thread.is_alive():
+            change()
+            return
+        with self._lock:
+            self._pending_changes.append(change)
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._wakeup_send.send(b"\0")
+        except OSError:
+            pass
+
+    def _register(self, controller: PooledController) -> None:
+        try:
+            fd = controller.serial_connection.fileno()
+            try:
+                self._selector.register(fd, selectors.EVENT_READ, controller)
+            except KeyError:
+                # Left behind by a port closed without being unregistered, the fd is this port's now
+                self._selector.modify(fd, selectors.EVENT_READ, controller)
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            self._polled[controller.lot_id] = controller
+
+    def _unregister(self, controller: PooledController) -> None:
+        if self._polled.pop(controller.lot_id, None) is not None:
+            return
+        try:
+            self._selector.unregister(controller.serial_connection.fileno())
+        except (AttributeError, KeyError, OSError, ValueError):
+            pass
+
+    def _read(self, controller: PooledController) -> None:
+        """Drain one port into its controller"""
+        connection = controller.serial_connection
+        try:
+            waiting = connection.in_waiting
+            if waiting or controller.lot_id not in self._polled:
+                chunk = connection.read(waiting or 1)
+                if not chunk and controller.lot_id not in self._polled:
+                    raise serial.SerialException("device reports readiness to read but returned no data")
+                controller._consume_bytes(chunk)
+        except (serial.SerialException, OSError) as e:
+            print(f"Serial error while reading lot {controller.lot_id}: {e}")
+            controller.is_connected_flag = False
+            self._unregister(controller)
+
+    def _io_loop(self) -> None:
+        """Body of the I/O thread"""
+        while not self._stop.is_set():
+            with self._lock:
+                changes, self._pending_changes = self._pending_changes, []
+            for change in changes:
+                try:
+                    change()
+                except Exception as e:
+                    print(f"Unexpected error while updating the selector: {type(e).__name__}: {e}")
+
+            timeout = POLL_INTERVAL if self._polled else SELECT_TIMEOUT
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    try:
+                        self._wakeup_recv.recv(4096)
+                    except OSError:
+                        pass
+                else:
+                    self._serve(key.data, self._read)
+
+            for controller in list(self._polled.values()):
+                self._serve(controller, self._read)
+            for controller in list(self._controllers.values()):
+                self._serve(controller, lambda controller: controller.tracker.expire())
+
+    def _serve(self, controller: PooledController, work: Callable[[PooledController], object]) -> None:
+        """Run work for one lot; a bug in its parsing or handlers is logged, the other lots keep going"""
+        try:
+            work(controller)
+        except Exception as e:
+            print(f"Unexpected error while serving lot {controller.lot_id}: {type(e).__name__}: {e}")
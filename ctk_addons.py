@@ -36,3 +36,49 @@ class IconEntry(CTkFrame):
             self.entry.configure(fg_color=kwargs["fg_color"])
 
         super().configure(**kwargs, require_redraw=require_redraw)
+
+
+def changed_fields(displayed, values):
+    """Fields whose value differs from what is displayed, as (label, text) pairs
+        Example: changed_fields({"LDR": "2345"}, {"LDR": 2400, "F1": 1}) -> [("LDR", "2400"), ("F1", "1")]"""
+    changes = []
+    for label, value in values.items():
+        text = str(value)
+        if displayed.get(label) != text:
+            changes.append((label, text))
+    return changes
+
+
+class FieldTable(CTkScrollableFrame):
+    """One "label: value" row per field, updated in place
+        update_values() only reconfigures the rows whose value changed, new fields get a row,
+        so an unchanged frame costs no redraw at all"""
+    def __init__(self, *args, font=None, placeholder_text="", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.grid_columnconfigure(1, weight=1)
+        self.font = font
+        self.displayed = {}  # label -> text currently shown
+        self.value_labels = {}  # label -> CTkLabel showing the value
+        self.placeholder = CTkLabel(master=self, text=placeholder_text, font=font, justify="left")
+        self.placeholder.grid(row=0, column=0, columnspan=2, sticky="w")
+
+    def update_values(self, values):
+        """Show new values, returns the number of rows that changed"""
+        changes = changed_fields(self.displayed, values)
+        if changes and self.placeholder is not None:
+            self.placeholder.destroy()
+            self.placeholder = None
+
+        for label, text in changes:
+            value_label = self.value_labels.get(label)
+            if value_label is None:
+                row = len(self.value_labels)
+                CTkLabel(master=self, text=f"{label}:", font=self.font, anchor="w").grid(
+                    row=row, column=0, sticky="w", padx=(5, 20))
+                value_label = CTkLabel(master=self, text=text, font=self.font, anchor="w")
+                value_label.grid(row=row, column=1, sticky="w")
+                self.value_labels[label] = value_label
+            else:
+                value_label.configure(text=text)
+            self.displayed[label] = text
+        return len(changes)
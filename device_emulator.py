@@ -0,0 +1,309 @@
+import argparse
+import os
+import random
+import select
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from telemetry.binary import encode_frame
+
+try:
+    import pty
+    import tty
+except ImportError:  # Windows has no pseudo terminals
+    pty = None
+    tty = None
+
+
+# Timings of FINAL.ino, in seconds of device time (see time_scale)
+BOOT_DELAY = 2.0  # "WELCOME!!!" on the LCD before the banner
+ROOF_DELAY = 7.5  # openRoof() / closeRoof()
+BARRIER_DELAY = 1.5  # Automatic barrier in AUTO mode
+ELEVATOR_TRAVEL = 3.0  # One trip between the ground floor and a parking floor
+ELEVATOR_PAUSE = 0.5  # delay(500) after each stop
+
+# Emulator settings
+FRAME_RATE = 10.0  # frames per second
+MAX_FRAMES_PER_WRITE = 1000  # Frames sent with a single write when the device falls behind
+IDLE_WAIT = 0.05  # seconds, longest wait for a command when no frame is due
+
+# Transcribed from FINAL.ino, not imported from the host, so a host that expects other text fails
+# against the emulator as it would against the board (see check_host_tables)
+BANNER = "=== He thong tong hop ESP32-S3 ==="
+
+# Confirmation printed by processSerialCommand() for each command
+COMMAND_REPLIES = {
+    "MODE_AUTO": ">>> Switched to AUTO mode",
+    "MODE_MANUAL": ">>> Switched to MANUAL mode",
+    "BARRIER_IN_OPEN": ">>> BARRIER IN: OPEN",
+    "BARRIER_IN_CLOSE": ">>> BARRIER IN: CLOSED",
+    "BARRIER_OUT_OPEN": ">>> BARRIER OUT: OPEN",
+    "BARRIER_OUT_CLOSE": ">>> BARRIER OUT: CLOSED",
+    "ELEVATOR_FLOOR_0": ">>> ELEVATOR: Moving to GROUND floor",
+    "ELEVATOR_FLOOR_1": ">>> ELEVATOR: Moving to floor 1",
+    "ELEVATOR_FLOOR_2": ">>> ELEVATOR: Moving to floor 2",
+    "LED_ALL_ON": ">>> LEDs: ALL ON",
+    "LED_ALL_OFF": ">>> LEDs: ALL OFF",
+    "RAIN_SHELTER_ON": ">>> RAIN SHELTER: CLOSED (deployed)",
+    "RAIN_SHELTER_OFF": ">>> RAIN SHELTER: OPEN (retracted)",
+    "TELEMETRY_BINARY": ">>> TELEMETRY: BINARY",
+    "TELEMETRY_TEXT": ">>> TELEMETRY: TEXT",
+}
+
+
+def check_host_tables() -> List[str]:
+    """Differences between what FINAL.ino prints (the tables above) and what the host expects"""
+    from arduino_comm import BANNER as HOST_BANNER
+    from command_tracker import CONFIRMATIONS
+
+    problems = []
+    if HOST_BANNER != BANNER:
+        problems.append(f"banner: host expects {HOST_BANNER!r}, FINAL.ino prints {BANNER!r}")
+    for command in sorted(COMMAND_REPLIES.keys() | CONFIRMATIONS.keys()):
+        expected, printed = CONFIRMATIONS.get(command), COMMAND_REPLIES.get(command)
+        if expected != printed:
+            problems.append(f"{command}: host expects {expected!r}, FINAL.ino prints {printed!r}")
+    return problems
+
+
+class VirtualDevice:
+    """Emulates FINAL.ino behind a pseudo terminal so ArduinoController.connect(device.port) works
+        Reproduces the boot banner, the telemetry frames (text or binary), the replies to every
+        command and the blocking roof / elevator / barrier delays during which the board neither
+        answers nor sends frames. frame_rate and jitter can go far beyond the real board, and
+        time_scale shrinks the blocking delays (0.01 = a hundred times faster)"""
+    def __init__(self, frame_rate: float = FRAME_RATE, jitter: float = 0.0, time_scale: float = 1.0,
+                 binary_telemetry: bool = False, seed: Optional[int] = None):
+        if pty is None:
+            raise RuntimeError("VirtualDevice needs pseudo terminals (Linux or macOS)")
+
+        self.frame_rate = frame_rate
+        self.jitter = jitter  # Each frame period varies by up to +/- this fraction
+        self.time_scale = time_scale
+        self.binary_telemetry = binary_telemetry
+        self.on_frames_sent: Optional[Callable[[int, float], None]] = None  # (frame count, write start time)
+
+        # Sensors, set them with set_sensor() to drive the host
+        self.sensors: Dict[str, int] = {"F1": 1, "F2": 1, "F3": 1, "In": 0, "Out": 0,
+                                        "LDR": 2000, "Rain": 0, "Fire": 0}
+        self.auto_ldr = True  # Random walk on the LDR reading
+
+        # Actuators, as left by the last command
+        self.mode = "AUTO"
+        self.barrier_in_open = False
+        self.barrier_out_open = False
+        self.leds_on = False
+        self.roof_closed = False
+        self.floor = 0
+
+        self.frames_sent = 0
+        self.commands_received: List[str] = []
+
+        self._random = random.Random(seed)
+        self._master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+
+        self._rx_buffer = bytearray()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self._boot_time = 0.0
+        self._is_closed = False  # isClosed of FINAL.ino, only tracks the automatic roof control
+
+    def start(self) -> "VirtualDevice":
+        """Power the board on: boot delay, banner, then the main loop"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="VirtualDevice", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Power the board off and release the pseudo terminal"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master_fd, self._slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def set_sensor(self, name: str, value: int) -> None:
+        """Change a sensor reading, e.g. set_sensor("Fire", 1)"""
+        if name == "LDR":
+            self.auto_ldr = False
+        self.sensors[name] = value
+
+    def _sleep(self, seconds: float) -> bool:
+        """Blocking delay of the firmware, returns False if the device was stopped meanwhile"""
+        return not self._stop.wait(seconds * self.time_scale)
+
+    def _send(self, data: bytes) -> None:
+        try:
+            os.write(self._master_fd, data)
+        except OSError:
+            pass
+
+    def _println(self, text: str) -> None:
+        self._send((text + "\r\n").encode("utf-8"))
+
+    def _run(self) -> None:
+        """setup() followed by loop() until stopped"""
+        self._boot_time = time.monotonic()
+        if not self._sleep(BOOT_DELAY):
+            return
+        self._println(BANNER)
+
+        next_frame = time.monotonic()
+        while not self._stop.is_set():
+            # Wait for a command until the next frame is due
+            wait = max(0.0, min(next_frame - time.monotonic(), IDLE_WAIT))
+            try:
+                readable, _, _ = select.select([self._master_fd], [], [], wait)
+                if readable:
+                    self._rx_buffer += os.read(self._master_fd, 4096)
+            except OSError:
+                break
+
+            self._process_serial_command()
+            self._automatic_control()
+
+            # Send every frame that is due, in one write
+            now = time.monotonic()
+            if now >= next_frame and self.frame_rate > 0:
+                frames = []
+                while now >= next_frame and len(frames) < MAX_FRAMES_PER_WRITE:
+                    frames.append(self._frame())
+                    period = 1.0 / self.frame_rate
+                    next_frame += period * (1 + self._random.uniform(-self.jitter, self.jitter))
+                if now - next_frame > 1.0:
+                    next_frame = now  # Too far behind, do not try to catch up
+                sent_at = time.monotonic()  # Before the write, the host may read the frames before it returns
+                self._send(b"".join(frames))
+                self.frames_sent += len(frames)
+                if self.on_frames_sent is not None:
+                    self.on_frames_sent(len(frames), sent_at)
+
+    def _frame(self) -> bytes:
+        """One telemetry frame as printed by loop()"""
+        if self.auto_ldr:
+            self.sensors["LDR"] = min(4095, max(0, self.sensors["LDR"] + self._random.randint(-20, 20)))
+        values = self.sensors
+
+        if self.binary_telemetry:
+            millis = int((time.monotonic() - self._boot_time) * 1000)
+            self._seq = (self._seq + 1) & 0xFF
+            return encode_frame(self._seq, millis, values)
+
+        return (f"F1: {values['F1']}, F2: {values['F2']}, F3: {values['F3']}, In: {values['In']}, "
+                f"Out: {values['Out']}, LDR: {values['LDR']}, Rain: {values['Rain']}, "
+                f"Fire: {values['Fire']}\r\n").encode("ascii")
+
+    def _process_serial_command(self) -> None:
+        """processSerialCommand(): at most one command per loop iteration"""
+        end = self._rx_buffer.find(b"\n")
+        if end < 0:
+            return
+        command = self._rx_buffer[:end].decode("utf-8", errors="ignore").strip()
+        del self._rx_buffer[:end + 1]
+
+        self.commands_received.append(command)
+        self._println(f"Received command: {command}")
+
+        reply = COMMAND_REPLIES.get(command)
+        if reply is None:
+            self._println(f">>> Unknown command: {command}")
+            return
+
+        if command.startswith("MODE_"):
+            self.mode = command[len("MODE_"):]
+        elif command.startswith("BARRIER_IN_"):
+            self.barrier_in_open = command.endswith("OPEN")
+        elif command.startswith("BARRIER_OUT_"):
+            self.barrier_out_open = command.endswith("OPEN")
+        elif command.startswith("LED_ALL_"):
+            self.leds_on = command.endswith("ON")
+        elif command.startswith("TELEMETRY_"):
+            self.binary_telemetry = command.endswith("BINARY")
+
+        # The elevator confirms first and then moves, the roof moves first and then confirms
+        if command == "RAIN_SHELTER_ON":
+            self._close_roof()
+        elif command == "RAIN_SHELTER_OFF":
+            self._open_roof()
+        self._println(reply)
+        if command.startswith("ELEVATOR_FLOOR_"):
+            self._move_to_floor(int(command[-1]))
+
+    def _automatic_control(self) -> None:
+        """The AUTO mode part of loop()"""
+        if self.mode != "AUTO":
+            return
+
+        if self.sensors["In"]:
+            self._sleep(BARRIER_DELAY)
+        if self.sensors["Out"]:
+            self._sleep(BARRIER_DELAY)
+
+        # handleRainSensor()
+        if self.sensors["Rain"] and not self._is_closed:
+            self._close_roof()
+            self._is_closed = True
+        elif not self.sensors["Rain"] and self._is_closed:
+            self._open_roof()
+            self._is_closed = False
+
+    def _close_roof(self) -> None:
+        self._sleep(ROOF_DELAY)
+        self.roof_closed = True
+        self._println(">>> Mai che DA DONG HOAN TOAN!")
+
+    def _open_roof(self) -> None:
+        self._sleep(ROOF_DELAY)
+        self.roof_closed = False
+        self._println(">>> Mai che DA MO HOAN TOAN!")
+
+    def _move_to_floor(self, floor: int) -> None:
+        """moveToFloor(): go up, pause, come back to the ground floor"""
+        self.floor = floor
+        if floor != 0:
+            self._sleep(ELEVATOR_TRAVEL)
+            self._println(f"✅ Reached floor {floor}")
+            self._sleep(ELEVATOR_PAUSE)
+            self._sleep(ELEVATOR_TRAVEL)
+            self._println("✅ Back to GROUND (Sensor triggered)")
+        else:
+            self._println("✅ Reached GROUND")
+        self._sleep(ELEVATOR_PAUSE)
+        self.floor = 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulate FINAL.ino on a pseudo terminal")
+    parser.add_argument("--rate", type=float, default=FRAME_RATE, help="telemetry frames per second")
+    parser.add_argument("--jitter", type=float, default=0.0, help="frame period jitter, fraction of the period")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="scale of the blocking delays")
+    parser.add_argument("--binary", action="store_true", help="start in binary telemetry mode")
+    parser.add_argument("--check", action="store_true",
+                        help="compare the banner and replies with what the host expects, then exit")
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = check_host_tables()
+        for mismatch in mismatches:
+            print(mismatch)
+        print(f"{len(mismatches)} mismatch(es) between FINAL.ino and the host")
+        raise SystemExit(1 if mismatches else 0)
+
+    device = VirtualDevice(args.rate, args.jitter, args.time_scale, args.binary).start()
+    print(f"Virtual device listening on {device.port}")
+    print("(Press Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopped by user")
+    finally:
+        device.stop()
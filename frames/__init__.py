@@ -1,8 +1,10 @@
-from . import login_frame
-from . import main_frame_dashboard
-from . import user_select_frame
-
-
+import importlib
 
+# Frames are imported on first use rather than with the package, see main.App.get_frame
+_MODULES = ("analytics_panel", "login_frame", "main_frame_dashboard", "trends_panel", "user_select_frame")
 
 
+def __getattr__(name):
+    if name in _MODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,87 @@
+import customtkinter as ctk
+from ctk_addons import FieldTable
+
+
+def window_name(seconds):
+    """Example: 60 -> "1 min", 3600 -> "1 h" """
+    return f"{seconds / 3600:g} h" if seconds >= 3600 else f"{seconds / 60:g} min"
+
+
+def percent(fraction):
+    return "-" if fraction is None else f"{fraction * 100:.0f}%"
+
+
+def format_analytics(snapshot):
+    """Rows of the analytics panel, "label" -> "value", from OccupancyAnalytics.snapshot()"""
+    windows = list(snapshot["entries_per_min"])
+    rows = {"Occupied now": f"{snapshot['occupied']} / {snapshot['spaces']}"}
+    for window in windows:
+        name = window_name(window)
+        rows[f"In / Out per min ({name})"] = (f"{snapshot['entries_per_min'][window]:.2f} / "
+                                              f"{snapshot['exits_per_min'][window]:.2f}")
+    for window in windows:
+        average = snapshot["average_occupancy"][window]
+        peak = snapshot["peak_occupancy"][window]
+        rows[f"Avg / peak occupied ({window_name(window)})"] = ("-" if average is None else
+                                                                f"{average:.2f} / {peak:g}")
+    for slot, utilisation in snapshot["utilisation"].items():
+        rows[f"{slot} utilisation"] = "  ".join(f"{window_name(window)}: {percent(utilisation[window])}"
+                                                for window in windows)
+    average = snapshot["all_time_average"]
+    rows["All time avg / peak"] = ("-" if average is None else
+                                   f"{average:.2f} / {snapshot['all_time_peak']}")
+    rows["Total in / out"] = f"{snapshot['total_entries']} / {snapshot['total_exits']}"
+    return rows
+
+
+class AnalyticsPopup(ctk.CTkToplevel):
+    """A popup with the live occupancy analytics, refreshed every second"""
+    def __init__(self, parent, analytics):
+        super().__init__(parent)
+        self.analytics = analytics
+        self.update_job = None
+
+        # Configure window
+        self.title("Occupancy Analytics")
+        self.geometry("700x520")
+        self.resizable(False, False)
+
+        # Header
+        header = ctk.CTkLabel(
+            self,
+            text="OCCUPANCY ANALYTICS",
+            font=ctk.CTkFont("Tw Cen MT Condensed Extra Bold", size=32, weight="bold"),
+            text_color="white"
+        )
+        header.pack(pady=(20, 10))
+
+        # Separator
+        separator = ctk.CTkFrame(self, height=2, fg_color="gray")
+        separator.pack(fill="x", padx=40, pady=(0, 20))
+
+        # Statistics, one row each
+        self.table = FieldTable(
+            self,
+            font=ctk.CTkFont("Consolas", size=16),
+            placeholder_text="Waiting for parking sensor data...",
+            width=640,
+            height=340,
+            fg_color=("#2b2b2b", "#1a1a1a")
+        )
+        self.table.pack(pady=10, padx=30)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the rows that changed, the windows slide even without new frames"""
+        snapshot = self.analytics.snapshot()
+        if snapshot["spaces"] and snapshot["all_time_average"] is not None:
+            self.table.update_values(format_analytics(snapshot))
+        self.update_job = self.after(1000, self.refresh)
+
+    def close(self):
+        if self.update_job is not None:
+            self.after_cancel(self.update_job)
+            self.update_job = None
+        self.destroy()
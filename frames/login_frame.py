@@ -1,7 +1,6 @@
 import customtkinter as ctk
-import CTkMessagebox as ctkmb
 import pywinstyles
-from PIL import Image
+from asset_cache import assets
 from ctk_addons import IconEntry
 
 
@@ -11,8 +10,7 @@ class LoginFrame(ctk.CTkFrame):
         super().__init__(master, fg_color="transparent")
 
         # Background image
-        self.background_img = ctk.CTkImage(dark_image=Image.open("assets/login_background.png"),
-                                          size=(2167, 1080))
+        self.background_img = assets.ctk_image("assets/login_background.png", (2167, 1080))
         self.background_label = ctk.CTkLabel(self, image=self.background_img, text="")
         self.background_label.place(x=0, y=0)
 
@@ -44,8 +42,8 @@ class LoginFrame(ctk.CTkFrame):
         pywinstyles.set_opacity(self.info_text, color="#000001")
 
         # Load icons for the entry fields
-        self.user_icon = ctk.CTkImage(Image.open("assets/user_icon.png"), size=(34, 34))
-        self.password_icon = ctk.CTkImage(Image.open("assets/password_icon.png"), size=(34, 34))
+        self.user_icon = assets.ctk_image("assets/user_icon.png", (34, 34))
+        self.password_icon = assets.ctk_image("assets/password_icon.png", (34, 34))
 
         # Username entry with icon
         self.name_entry = IconEntry(self, icon=self.user_icon, 
@@ -128,4 +126,5 @@ class LoginFrame(ctk.CTkFrame):
             self.master.show_main(name)
         else:
             self.password_entry.delete(0, ctk.END)
+            import CTkMessagebox as ctkmb  # Only needed on a failed login, not at startup
             ctkmb.CTkMessagebox(title="Error", message="Invalid username or password!", icon="cancel")
\ No newline at end of file
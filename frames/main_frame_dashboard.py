@@ -1,7 +1,18 @@
 import customtkinter as ctk
 import pywinstyles
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 from arduino_comm import ArduinoController
+from asset_cache import assets
+from command_queue import CommandQueue
+from ctk_addons import FieldTable
+from frames.analytics_panel import AnalyticsPopup
+from frames.trends_panel import TrendsPopup
+from link_supervisor import CONNECTED, RECONNECTING, LinkSupervisor, PortIdentity
+from port_inventory import PortInventory
+from telemetry.alarms import AlarmEngine
+from telemetry.analytics import OccupancyAnalytics
+from telemetry.events import TK, TkDispatcher
+from telemetry.recorder import TelemetryRecorder
 
 
 class MainFrameDashboard(ctk.CTkFrame):
@@ -12,6 +23,29 @@ class MainFrameDashboard(ctk.CTkFrame):
         
         # Initialize Arduino controller
         self.arduino = ArduinoController()
+        self.command_queue = CommandQueue(self.arduino)
+        self.link_supervisor = LinkSupervisor(self.arduino, self.command_queue)
+        
+        # Fire / rain / occupancy alarms, evaluated on the reader thread and shown from the Tk loop
+        self.alert_dispatcher = TkDispatcher(self)
+        self.alarm_engine = AlarmEngine(
+            on_alert=lambda alert: self.alert_dispatcher.post(self.show_alert, alert),
+            send_command=self.command_queue.put
+        )
+        
+        # Occupancy statistics over sliding windows, see show_analytics
+        self.analytics = OccupancyAnalytics()
+        self.analytics_popup = None
+        self.trends_popup = None
+        
+        # Serial ports are enumerated in the background, see update_port_list
+        self.port_inventory = PortInventory().start()
+        self.port_list_version = 0
+        self.port_update_job = None
+        self.connect_executor = ThreadPoolExecutor(max_workers=1)
+        self.connect_future = None
+        self.link_update_job = None
+        self.reported_timeouts = 0
         self.current_user = ""
         
         # Track elevator floor state
@@ -21,15 +55,13 @@ class MainFrameDashboard(ctk.CTkFrame):
         # Sensor data popup tracking
         self.sensor_popup = None
         self.sensor_update_job = None
+        self.sensor_subscription = None
         
         # Operation mode tracking
         self.mode_var = ctk.StringVar(value="AUTO")
         
         # Background image
-        self.background_img = ctk.CTkImage(
-            dark_image=Image.open("assets/main_background.png"),
-            size=(1920, 1080)
-        )
+        self.background_img = assets.ctk_image("assets/main_background.png", (1920, 1080))
         self.background_label = ctk.CTkLabel(self, image=self.background_img, text="")
         self.background_label.place(x=0, y=0, relwidth=1, relheight=1)
         
@@ -79,6 +111,17 @@ class MainFrameDashboard(ctk.CTkFrame):
         )
         self.logout_button.grid(row=0, column=2, padx=70, pady=(50, 20), sticky="e")
         pywinstyles.set_opacity(self.logout_button, color="#000001")
+        
+        # Active alarms, empty while there is none
+        self.alarm_label = ctk.CTkLabel(
+            self,
+            text="",
+            font=ctk.CTkFont("Tw Cen MT Condensed Extra Bold", size=40),
+            text_color="#f44336",
+            bg_color='#000001'
+        )
+        self.alarm_label.place(relx=0.5, rely=0.03, anchor="n")
+        pywinstyles.set_opacity(self.alarm_label, color="#000001")
     
     def create_connection_bar(self):
         """Create the connection interface bar"""
@@ -102,6 +145,15 @@ class MainFrameDashboard(ctk.CTkFrame):
         )
         self.status_label.grid(row=0, column=0, padx=20, pady=20, sticky="w")
         
+        # Outbound command queue depth, empty while nothing is waiting
+        self.queue_label = ctk.CTkLabel(
+            self.connection_bar,
+            text="",
+            font=ctk.CTkFont("Bahnschrift Light Condensed", size=20),
+            text_color="white"
+        )
+        self.queue_label.grid(row=0, column=0, padx=10, pady=20, sticky="e")
+        
         # COM Port label
         ctk.CTkLabel(
             self.connection_bar,
@@ -111,7 +163,7 @@ class MainFrameDashboard(ctk.CTkFrame):
         ).grid(row=0, column=1, padx=5, pady=20, sticky="e")
         
         # COM Port dropdown
-        self.port_var = ctk.StringVar(value="No ports found")
+        self.port_var = ctk.StringVar(value="Scanning...")
         self.port_dropdown = ctk.CTkOptionMenu(
             self.connection_bar,
             variable=self.port_var,
@@ -136,6 +188,7 @@ class MainFrameDashboard(ctk.CTkFrame):
             hover_color=("#606060", "#505050")
         )
         self.refresh_button.grid(row=0, column=3, padx=5, pady=20, sticky="e")
+        self.update_port_list()
         
         # Connect/Disconnect button
         self.connect_button = ctk.CTkButton(
@@ -153,10 +206,7 @@ class MainFrameDashboard(ctk.CTkFrame):
     def create_isometric_view(self):
         """Create the left side isometric parking lot view"""
         # Load parking lot overview image
-        self.parking_lot_img = ctk.CTkImage(
-            dark_image=Image.open("assets/parking_lot_overview.png"),
-            size=(1280, 720)
-        )
+        self.parking_lot_img = assets.ctk_image("assets/parking_lot_overview.png", (1280, 720))
         
         # Create image label
         self.parking_lot_label = ctk.CTkLabel(
@@ -432,21 +482,52 @@ class MainFrameDashboard(ctk.CTkFrame):
         self.light_switch.grid(row=0, column=0, padx=15, sticky="w")
     
     def create_overview_button_in_panel(self):
-        """Create overview button at bottom of control panel"""
+        """Create the sensor data, trends and analytics buttons at bottom of control panel"""
+        buttons_frame = ctk.CTkFrame(self.control_panel, fg_color="transparent")
+        buttons_frame.grid(row=self.current_row, column=0, pady=(30, 10))
+        self.current_row += 1
+        
         # Overview button (moved from bottom section)
         self.overview_button = ctk.CTkButton(
-            self.control_panel,
+            buttons_frame,
             text="Sensor data",
             command=self.show_sensor_data,
             font=ctk.CTkFont("Bahnschrift Light Condensed", size=30, weight="bold"),
-            width=200,
+            width=140,
             height=45,
             fg_color=("#505050", "#404040"),
             hover_color=("#606060", "#505050"),
             corner_radius=10
         )
-        self.overview_button.grid(row=self.current_row, column=0, pady=(30, 10))
-        self.current_row += 1
+        self.overview_button.grid(row=0, column=0, padx=5)
+        
+        # Trends button
+        self.trends_button = ctk.CTkButton(
+            buttons_frame,
+            text="Trends",
+            command=self.show_trends,
+            font=ctk.CTkFont("Bahnschrift Light Condensed", size=30, weight="bold"),
+            width=140,
+            height=45,
+            fg_color=("#505050", "#404040"),
+            hover_color=("#606060", "#505050"),
+            corner_radius=10
+        )
+        self.trends_button.grid(row=0, column=1, padx=5)
+        
+        # Analytics button
+        self.analytics_button = ctk.CTkButton(
+            buttons_frame,
+            text="Analytics",
+            command=self.show_analytics,
+            font=ctk.CTkFont("Bahnschrift Light Condensed", size=30, weight="bold"),
+            width=140,
+            height=45,
+            fg_color=("#505050", "#404040"),
+            hover_color=("#606060", "#505050"),
+            corner_radius=10
+        )
+        self.analytics_button.grid(row=0, column=2, padx=5)
     
     def create_bottom_section(self):
         """Create the welcome message"""
@@ -514,38 +595,96 @@ class MainFrameDashboard(ctk.CTkFrame):
         self.send_command(command)
     
     def get_available_ports(self):
-        """Get list of available COM ports"""
-        ports = ArduinoController.list_available_ports()
+        """Get list of available COM ports from the background inventory (never blocks)"""
+        if not self.port_inventory.scanned:
+            return ["Scanning..."]
+        ports = self.port_inventory.devices()
         return ports if ports else ["No ports found"]
     
     def refresh_ports(self):
-        """Refresh the list of available COM ports"""
-        ports = self.get_available_ports()
-        self.port_dropdown.configure(values=ports)
-        if ports and ports[0] != "No ports found":
-            self.port_var.set(ports[0])
-        else:
-            self.port_var.set("No ports found")
+        """Ask the inventory for a new scan, the dropdown follows once it is done"""
+        self.port_inventory.refresh()
+    
+    def update_port_list(self):
+        """Rebuild the port dropdown when the set of ports changed"""
+        if self.port_inventory.version != self.port_list_version:
+            self.port_list_version = self.port_inventory.version
+            ports = self.get_available_ports()
+            self.port_dropdown.configure(values=ports)
+            
+            # Keep the selection while its port is still there
+            if self.port_var.get() not in ports:
+                self.port_var.set(ports[0])
+        
+        self.port_update_job = self.after(250, self.update_port_list)
     
     def toggle_connection(self):
         """Connect or disconnect from Arduino"""
-        if self.arduino.is_connected():
+        if self.arduino.is_connected() or self.link_supervisor.is_running():
             self.disconnect_arduino()
         else:
             self.connect_arduino()
     
     def connect_arduino(self):
-        """Connect to Arduino on selected port"""
+        """Connect to Arduino on selected port, without blocking the UI"""
         port = self.port_var.get()
         
-        if port == "Select Port" or port == "No ports found":
+        if port in ("Select Port", "No ports found", "Scanning..."):
             self.show_error("Please select a valid COM port")
             return
         
+        baudrate = 115200  # Default baudrate
+        
+        # connect() waits for the board to boot, run it on a worker thread
+        self.connect_future = self.connect_executor.submit(self.connect_and_open_log, port, baudrate)
+        self.status_label.configure(text="● Connecting...", text_color="orange")
+        self.connect_button.configure(state="disabled")
+        self.port_dropdown.configure(state="disabled")
+        self.refresh_button.configure(state="disabled")
+        self.after(50, self.finish_connect, port, baudrate)
+    
+    def connect_and_open_log(self, port, baudrate):
+        """Worker thread: connect, then open the telemetry log (it scans and indexes the segments on disk)"""
+        if not self.arduino.connect(port, baudrate):
+            return False
+        
+        # Keep every frame on disk for post-incident analysis
+        if self.arduino.recorder is None:
+            try:
+                self.arduino.recorder = TelemetryRecorder()
+            except (OSError, ValueError) as e:
+                print(f"Telemetry log disabled: {e}")
+        return True
+    
+    def finish_connect(self, port, baudrate):
+        """Poll the pending connection and update the UI once it is done"""
+        if not self.connect_future.done():
+            self.after(50, self.finish_connect, port, baudrate)
+            return
+        
+        self.connect_button.configure(state="normal")
         try:
-            baudrate = 115200  # Default baudrate
-            
-            if self.arduino.connect(port, baudrate):
+            if self.connect_future.result():
+                # Keep every frame in memory for the trend charts (the telemetry log is already open)
+                self.arduino.enable_history()
+                
+                # Drain the port on a background thread so telemetry never backs up
+                self.arduino.start_reader()
+                
+                # Send commands from a background thread
+                self.command_queue.start()
+                
+                # Reconnect by itself after a cable glitch or a board reset, identifying the board
+                # from the inventory's cached scan (enumerating the ports here would stall the UI)
+                info = self.port_inventory.ports().get(port)
+                identity = PortIdentity(info.vid, info.pid, info.serial_number) if info and info.is_usb() else None
+                self.link_supervisor.start(port, baudrate, identity=identity)
+                
+                # Watch the sensors for alarms and occupancy statistics
+                self.alarm_engine.attach(self.arduino.events, self.arduino.get_snapshot())
+                self.analytics.attach(self.arduino.events, self.arduino.get_snapshot())
+                self.update_link_status()
+                
                 # Update UI
                 self.status_label.configure(
                     text="● Connected",
@@ -556,20 +695,40 @@ class MainFrameDashboard(ctk.CTkFrame):
                     fg_color=("#f44336", "#da190b"),
                     hover_color=("#da190b", "#b71c1c")
                 )
-                
-                # Disable port selection
-                self.port_dropdown.configure(state="disabled")
-                self.refresh_button.configure(state="disabled")
-            else:
-                self.show_error(f"Failed to connect to {port}")
+                return
+            
+            self.show_error(f"Failed to connect to {port}")
         
         except Exception as e:
             self.show_error(f"Connection error: {str(e)}")
+        
+        # Enable port selection again
+        self.status_label.configure(text="● Disconnected", text_color="red")
+        self.port_dropdown.configure(state="normal")
+        self.refresh_button.configure(state="normal")
     
     def disconnect_arduino(self):
         """Disconnect from Arduino"""
+        self.alarm_engine.detach()
+        self.analytics.detach()
+        self.link_supervisor.stop()
+        self.command_queue.stop()
+        if self.link_update_job is not None:
+            self.after_cancel(self.link_update_job)
+            self.link_update_job = None
+        self.queue_label.configure(text="")
         self.arduino.disconnect()
         
+        # Round-trip latency of the commands of this session
+        for command, latency in self.arduino.tracker.latency_report().items():
+            print(f"{command}: {latency['count']} confirmed, p50 {latency['p50_ms']:.1f} ms, "
+                  f"p99 {latency['p99_ms']:.1f} ms, max {latency['max_ms']:.1f} ms")
+        
+        # Write out the rest of the telemetry log
+        if self.arduino.recorder is not None:
+            self.arduino.recorder.close()
+            self.arduino.recorder = None
+        
         # Update UI
         self.status_label.configure(
             text="● Disconnected",
@@ -586,17 +745,50 @@ class MainFrameDashboard(ctk.CTkFrame):
         self.refresh_button.configure(state="normal")
     
     def send_command(self, command):
-        """Send a command to the Arduino"""
-        if not self.arduino.is_connected():
+        """Queue a command for the Arduino, returns at once"""
+        if not self.arduino.is_connected() and not self.link_supervisor.is_running():
             self.show_error("Not connected to Arduino")
             return
         
-        if self.arduino.write(command):
-            # Show brief feedback
-            print(f"Command sent: {command}")
-        else:
-            self.show_error("Failed to send command")
+        # Replaces any command still waiting for the same actuator
+        depth = self.command_queue.put(command)
+        print(f"Command queued: {command} ({depth} waiting)")
+        self.update_link_status(reschedule=False)
     
+    def update_link_status(self, reschedule=True):
+        """Show the link state and how many commands are waiting to be sent or confirmed"""
+        if self.link_supervisor.state == RECONNECTING:
+            self.status_label.configure(text="● Reconnecting...", text_color="orange")
+        elif self.link_supervisor.state == CONNECTED:
+            self.status_label.configure(text="● Connected", text_color="green")
+        
+        depth = self.command_queue.depth()
+        unconfirmed = self.arduino.tracker.pending_count()
+        parts = []
+        if depth:
+            parts.append(f"Queued: {depth}")
+        if unconfirmed:
+            parts.append(f"Unconfirmed: {unconfirmed}")
+        self.queue_label.configure(text="  ".join(parts))
+        
+        if self.command_queue.failed:
+            self.show_error(f"Failed to send {self.command_queue.failed} command(s)")
+            self.command_queue.failed = 0
+        if self.arduino.tracker.timeouts > self.reported_timeouts:
+            self.show_error(f"{self.arduino.tracker.timeouts - self.reported_timeouts} command(s) not confirmed by the Arduino")
+            self.reported_timeouts = self.arduino.tracker.timeouts
+        
+        # Schedule next update
+        if reschedule:
+            self.link_update_job = self.after(200, self.update_link_status)
+    
+    
+    def show_alert(self, alert):
+        """Update the alarm banner when an alarm raises or clears"""
+        active = self.alarm_engine.active_alarms()
+        self.alarm_label.configure(text="  |  ".join(rule.message for rule in active))
+        if alert.active:
+            self.show_error(f"Alarm: {alert.message}")
     
     def show_error(self, message):
         """Display an error message"""
@@ -615,11 +807,33 @@ class MainFrameDashboard(ctk.CTkFrame):
             self.close_sensor_popup()
         
         # Disconnect Arduino before logging out
-        if self.arduino.is_connected():
+        if self.arduino.is_connected() or self.link_supervisor.is_running():
             self.disconnect_arduino()
         
         self.master.show_login()
     
+    def show_analytics(self):
+        """Display the occupancy analytics in a popup window"""
+        # If popup already exists, bring it to front
+        if self.analytics_popup is not None and self.analytics_popup.winfo_exists():
+            self.analytics_popup.focus()
+            return
+        
+        self.analytics_popup = AnalyticsPopup(self, self.analytics)
+    
+    def show_trends(self):
+        """Display the sensor history as live charts in a popup window"""
+        if self.arduino.history is None:
+            self.show_error("No sensor history yet. Please connect first.")
+            return
+        
+        # If popup already exists, bring it to front
+        if self.trends_popup is not None and self.trends_popup.winfo_exists():
+            self.trends_popup.focus()
+            return
+        
+        self.trends_popup = TrendsPopup(self, self.arduino.history)
+    
     def show_sensor_data(self):
         """Display sensor data in a popup window"""
         # Check if Arduino is connected
@@ -661,17 +875,16 @@ class MainFrameDashboard(ctk.CTkFrame):
         separator = ctk.CTkFrame(self.sensor_popup, height=2, fg_color="gray")
         separator.pack(fill="x", padx=40, pady=(0, 20))
         
-        # Data display area (using CTkTextbox for better formatting)
-        self.sensor_data_display = ctk.CTkTextbox(
+        # Data display area, one row per sensor updated in place
+        self.sensor_table = FieldTable(
             self.sensor_popup,
             font=ctk.CTkFont("Consolas", size=18),
+            placeholder_text="Waiting for sensor data...\n\nMake sure Arduino is:\n1. Connected\n2. Sending sensor data",
             width=540,
             height=220,
-            fg_color=("#2b2b2b", "#1a1a1a"),
-            text_color="white",
-            wrap="none"
+            fg_color=("#2b2b2b", "#1a1a1a")
         )
-        self.sensor_data_display.pack(pady=10, padx=30)
+        self.sensor_table.pack(pady=10, padx=30)
         
         # Close button
         close_button = ctk.CTkButton(
@@ -689,48 +902,43 @@ class MainFrameDashboard(ctk.CTkFrame):
         # Bind window close event
         self.sensor_popup.protocol("WM_DELETE_WINDOW", self.close_sensor_popup)
         
-        # Start updating sensor data
+        # Redraw the fields that change, from the Tk loop (only the latest change of each field)
+        self.sensor_subscription = self.arduino.events.subscribe(
+            self.on_sensor_change, dispatch=TK, widget=self.sensor_popup, coalesce=True
+        )
+        self.sensor_table.update_values(self.arduino.get_snapshot())
         self.update_sensor_display()
     
+    def on_sensor_change(self, event):
+        """Show the latest value of a changed field (the dispatcher keeps only the last change per flush)"""
+        if self.sensor_popup is not None and self.sensor_popup.winfo_exists():
+            self.sensor_table.update_values({event.field: event.new})
+    
     def update_sensor_display(self):
-        """Continuously read and update sensor data display"""
+        """Poll the port while the background reader is not running (it publishes the changes otherwise)"""
+        self.sensor_update_job = None
+        
         # Check if popup still exists
         if self.sensor_popup is None or not self.sensor_popup.winfo_exists():
-            self.sensor_update_job = None
             return
         
-        # Read available data from Arduino buffer
-        # With Arduino sending at reasonable rate (100-200ms), read a few times
-        # to ensure we get the latest data
-        data_read = False
+        # The reader thread publishes every change, nothing to poll until it stops
+        if self.arduino.is_reader_running():
+            return
+        
         for _ in range(10):  # Read up to 10 times to get latest data
-            if self.arduino.read_data():
-                data_read = True
-            else:
+            if not self.arduino.read_data():
                 break  # No more data available
         
-        # Get all sensor values
-        sensor_values = self.arduino.get_all_values()
-        
-        # Format the data for display
-        if sensor_values:
-            display_text = ""
-            for label, value in sensor_values.items():
-                display_text += f"{label}: {value}\n"
-            
-            # Update the textbox
-            self.sensor_data_display.delete("1.0", "end")
-            self.sensor_data_display.insert("1.0", display_text)
-        else:
-            # No data available yet
-            self.sensor_data_display.delete("1.0", "end")
-            self.sensor_data_display.insert("1.0", "Waiting for sensor data...\n\nMake sure Arduino is:\n1. Connected\n2. Sending sensor data")
-        
-        # Schedule next update (200ms for smooth updates)
+        # Schedule next check
         self.sensor_update_job = self.after(200, self.update_sensor_display)
     
     def close_sensor_popup(self):
         """Close the sensor data popup and stop updates"""
+        if self.sensor_subscription is not None:
+            self.arduino.events.unsubscribe(self.sensor_subscription)
+            self.sensor_subscription = None
+        
         # Cancel scheduled updates
         if self.sensor_update_job is not None:
             self.after_cancel(self.sensor_update_job)
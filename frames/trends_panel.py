@@ -0,0 +1,193 @@
+import time
+from collections import deque
+from typing import Deque, NamedTuple, Optional, Sequence, Tuple
+import customtkinter as ctk
+from frames.analytics_panel import window_name
+from telemetry.downsample import Column, MinMaxDownsampler
+from telemetry.history import TelemetryHistory
+
+
+# Chart settings
+SPANS = (60.0, 600.0, 3600.0)  # seconds shown across the chart, picked in the popup
+REFRESH_INTERVAL = 250  # ms between two redraws
+LABEL_WIDTH = 90  # px left of the plot for the lane names
+LANE_GAP = 10  # px between two lanes
+
+
+class Lane(NamedTuple):
+    """One strip of the chart: a history field drawn between low and high
+        invert draws 1 - value, e.g. a parking sensor reading 1 while the space is free"""
+    label: str
+    field: str
+    low: float
+    high: float
+    color: str
+    weight: int = 1  # Relative height
+    invert: bool = False
+
+
+# LDR is a 12-bit analogRead(), F1..F3 are the spaces of the ground floor, floor 1 and floor 2
+LANES = [
+    Lane("LDR", "LDR", 0, 4095, "#FFC107", weight=3),
+    Lane("Ground", "F1", 0, 1, "#4CAF50", invert=True),
+    Lane("Floor 1", "F2", 0, 1, "#4CAF50", invert=True),
+    Lane("Floor 2", "F3", 0, 1, "#4CAF50", invert=True),
+    Lane("Rain", "Rain", 0, 1, "#2196F3"),
+    Lane("Fire", "Fire", 0, 1, "#f44336"),
+]
+
+
+class _Series:
+    """Drawing state of one lane"""
+    __slots__ = ("lane", "top", "bottom", "samples", "since", "items")
+
+    def __init__(self, lane: Lane, top: float, bottom: float):
+        self.lane = lane
+        self.top = top
+        self.bottom = bottom
+        self.samples: Optional[MinMaxDownsampler] = None  # One bucket per pixel column
+        self.since = 0.0  # Timestamp of the newest row read from the history
+        self.items: Deque[Tuple[int, int]] = deque()  # (column index, canvas item), oldest first
+
+    def y(self, value: float) -> float:
+        lane = self.lane
+        if lane.invert:
+            value = 1 - value
+        fraction = min(max((value - lane.low) / (lane.high - lane.low), 0.0), 1.0)
+        return self.bottom - fraction * (self.bottom - self.top)
+
+
+class TrendChart(ctk.CTkCanvas):
+    """Scrolling strip chart of TelemetryHistory fields, one lane per field
+        Every lane is downsampled to one min/max column per pixel, so the canvas never holds
+        more than one line per pixel and lane whatever the history length. Each redraw reads
+        only the rows appended since the previous one, scrolls the existing lines with a
+        single move() and draws the columns that scrolled in (plus the still open newest one)"""
+    def __init__(self, master, history: TelemetryHistory, lanes: Sequence[Lane] = LANES,
+                 span: float = SPANS[1], width: int = 760, height: int = 420, **kwargs):
+        super().__init__(master, width=width, height=height, bg="#1a1a1a", highlightthickness=0, **kwargs)
+        self.history = history
+        self.span = span
+        self.plot_width = width - LABEL_WIDTH
+        self.head = None  # Absolute index of the column at the right edge
+
+        # Lane layout, fixed value ranges so lines drawn once never need rescaling
+        self.series = []
+        plot_height = height - 20 - LANE_GAP * len(lanes)
+        top = LANE_GAP / 2
+        for lane in lanes:
+            bottom = top + plot_height * lane.weight / sum(other.weight for other in lanes)
+            self.series.append(_Series(lane, top, bottom))
+            self.create_rectangle(LABEL_WIDTH, top, width - 1, bottom, outline="#333333")
+            self.create_text(8, (top + bottom) / 2, text=lane.label, anchor="w", fill=lane.color,
+                             font=("Consolas", 12))
+            top = bottom + LANE_GAP
+
+        self.span_label = self.create_text(LABEL_WIDTH, height - 4, anchor="sw", fill="gray",
+                                           font=("Consolas", 10))
+        self.create_text(width - 1, height - 4, text="now", anchor="se", fill="gray", font=("Consolas", 10))
+        self.set_span(span)
+
+    def set_span(self, span: float) -> None:
+        """Show the last span seconds, redrawn from the history"""
+        self.span = span
+        self.itemconfigure(self.span_label, text=f"-{window_name(span)}")
+        self.delete("data")
+        self.head = None
+
+        now = time.monotonic()
+        for series in self.series:
+            series.samples = MinMaxDownsampler(span / self.plot_width, self.plot_width)
+            series.since = now - span
+            series.items.clear()
+        self.redraw(now)
+
+    def redraw(self, now: Optional[float] = None) -> None:
+        """Scroll to now and draw what changed since the last redraw"""
+        now = time.monotonic() if now is None else now
+        head = int(now // (self.span / self.plot_width))
+        if self.head is not None and head > self.head:
+            self.move("data", self.head - head, 0)
+        self.head = head
+        first = head - self.plot_width + 1
+
+        for series in self.series:
+            # Forget the columns that scrolled out
+            items = series.items
+            while items and items[0][0] < first:
+                self.delete(items.popleft()[1])
+
+            # Only the rows appended since the last redraw (the newest one again, which is harmless)
+            timestamps, values = self.history.since(series.lane.field, series.since)
+            if len(timestamps):
+                series.since = timestamps[-1]
+            changed = series.samples.add(timestamps, values)
+            if changed is None:
+                continue
+
+            while items and items[-1][0] >= changed:
+                self.delete(items.pop()[1])
+            previous, columns = series.samples.tail(max(changed, first))
+            for column in columns:
+                items.append((column.index, self._draw_column(series, previous, column)))
+                previous = column
+
+    def _draw_column(self, series: _Series, previous: Optional[Column], column: Column) -> int:
+        """One polyline: from the previous column's last value, through first, low, high and last"""
+        x = LABEL_WIDTH + self.plot_width - 1 - (self.head - column.index)
+        if previous is not None and previous.index == column.index - 1:
+            start = series.y(previous.last)
+        else:
+            start = series.y(column.first)
+        points = (x - 1, start, x, series.y(column.first), x, series.y(column.low),
+                  x, series.y(column.high), x, series.y(column.last))
+        return self.create_line(*points, fill=series.lane.color, tags="data")
+
+
+class TrendsPopup(ctk.CTkToplevel):
+    """A popup with live trend charts of the sensor history"""
+    def __init__(self, parent, history: TelemetryHistory):
+        super().__init__(parent)
+        self.update_job = None
+
+        # Configure window
+        self.title("Sensor Trends")
+        self.geometry("820x600")
+        self.resizable(False, False)
+
+        # Header
+        header = ctk.CTkLabel(
+            self,
+            text="SENSOR TRENDS",
+            font=ctk.CTkFont("Tw Cen MT Condensed Extra Bold", size=32, weight="bold"),
+            text_color="white"
+        )
+        header.pack(pady=(20, 10))
+
+        # Time span selection
+        spans = {window_name(span): span for span in SPANS}
+        self.span_selector = ctk.CTkSegmentedButton(
+            self,
+            values=list(spans),
+            command=lambda name: self.chart.set_span(spans[name]),
+            font=ctk.CTkFont("Bahnschrift Light Condensed", size=18, weight="bold")
+        )
+        self.span_selector.set(window_name(SPANS[1]))
+        self.span_selector.pack(pady=(0, 10))
+
+        # Chart
+        self.chart = TrendChart(self, history, span=SPANS[1])
+        self.chart.pack(pady=10, padx=30)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def refresh(self):
+        self.chart.redraw()
+        self.update_job = self.after(REFRESH_INTERVAL, self.refresh)
+
+    def close(self):
+        if self.update_job is not None:
+            self.after_cancel(self.update_job)
+            self.update_job = None
+        self.destroy()
@@ -1,8 +1,7 @@
 import os
 import customtkinter as ctk
-import CTkMessagebox as ctkmb
 import pywinstyles
-from PIL import Image
+from asset_cache import assets
 from ctk_addons import IconEntry
 
 
@@ -42,7 +41,7 @@ class PasswordDialog(ctk.CTkToplevel):
         
         # Password entry
         self.password_entry = IconEntry(
-            self, icon=ctk.CTkImage(Image.open("assets/password_icon.png"), size=(34, 34)),
+            self, icon=assets.ctk_image("assets/password_icon.png", (34, 34)),
             placeholder_text="Password",
             corner_radius=15,
             border_width=2, border_color="#FFFFFF",
@@ -87,6 +86,7 @@ class PasswordDialog(ctk.CTkToplevel):
             self.destroy()
             self.on_success_callback(self.username)
         else:
+            import CTkMessagebox as ctkmb  # Only needed on a wrong password, not at startup
             ctkmb.CTkMessagebox(
                 title="Error",
                 message="Invalid password!",
@@ -102,15 +102,12 @@ class UserSelectFrame(ctk.CTkFrame):
         super().__init__(master, fg_color="transparent")
         
         # Background image
-        self.background_img = ctk.CTkImage(
-            dark_image=Image.open("assets/user_select_background.png"),
-            size=(1920, 1080)
-        )
+        self.background_img = assets.ctk_image("assets/user_select_background.png", (1920, 1080))
         self.background_label = ctk.CTkLabel(self, image=self.background_img, text="")
         self.background_label.place(x=0, y=0)
         
         # Get users from database (User objects with profile pics)
-        self.users = master.perm_manager.get_user_objects()[:3]  # First 3 users
+        self.users = master.perm_manager.get_user_objects(limit=3)  # First 3 users, one page
 
         # Logo
         self.logo = ctk.CTkLabel(
@@ -203,10 +200,7 @@ class UserSelectFrame(ctk.CTkFrame):
         if user_obj.profile_pic and os.path.exists(user_obj.profile_pic):
             # Load and display profile picture
             try:
-                profile_img = ctk.CTkImage(
-                    Image.open(user_obj.profile_pic),
-                    size=(450, 450)
-                )
+                profile_img = assets.ctk_image(user_obj.profile_pic, (450, 450))
                 profile_label = ctk.CTkLabel(
                     image_container,
                     image=profile_img,
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+import serial.tools.list_ports
+from arduino_comm import BAUDRATE, READY_TIMEOUT, ArduinoController
+from command_queue import CommandQueue
+
+
+# Supervisor settings
+LINK_CHECK_INTERVAL = 0.02  # seconds between link checks while connected
+PORT_POLL_INTERVAL = 0.1  # seconds between port scans while the device is gone
+BACKOFF_INITIAL = 0.05  # seconds before retrying a failed connect
+BACKOFF_MAX = 5.0  # seconds, cap of the exponential backoff
+
+# Supervisor states
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+STOPPED = "stopped"
+
+
+class PortIdentity(NamedTuple):
+    """USB identity of a serial port, survives the port being renumbered (COM3 -> COM4)"""
+    vid: Optional[int]
+    pid: Optional[int]
+    serial_number: Optional[str]
+
+
+def port_identity(port: str) -> Optional[PortIdentity]:
+    """USB identity of a port, None if it is not a USB device"""
+    for info in serial.tools.list_ports.comports():
+        if info.device == port and info.vid is not None:
+            return PortIdentity(info.vid, info.pid, info.serial_number)
+    return None
+
+
+def find_port(port: str, identity: Optional[PortIdentity]) -> Optional[str]:
+    """Current port of the device: by USB identity if known, else by name. None if it is gone"""
+    ports = serial.tools.list_ports.comports()
+    if identity is not None:
+        for info in ports:
+            if (info.vid, info.pid) == (identity.vid, identity.pid) and \
+                    (identity.serial_number is None or info.serial_number == identity.serial_number):
+                return info.device
+        return None
+
+    # Not a USB device (or not listed, e.g. a pseudo terminal), go by its name
+    if any(info.device == port for info in ports) or os.path.exists(port):
+        return port
+    return None
+
+
+class LinkSupervisor:
+    """Keeps an ArduinoController connected without operator action
+        A watcher thread notices the link going down within LINK_CHECK_INTERVAL, waits for the
+        same USB device (VID/PID/serial number) to come back on any port, reconnects with
+        exponential backoff, restarts the reader and replays the desired actuator state
+        through the command queue"""
+    def __init__(self, controller: ArduinoController, command_queue: Optional[CommandQueue] = None,
+                 on_state_change: Optional[Callable[[str], None]] = None):
+        self.controller = controller
+        self.command_queue = command_queue
+        self.on_state_change = on_state_change  # Called from the watcher thread
+        self.state = STOPPED
+        self.port: Optional[str] = None
+        self.identity: Optional[PortIdentity] = None
+        self.reconnects = 0
+        self.last_downtime: Optional[float] = None  # seconds, link loss to ready again
+
+        self._baudrate = BAUDRATE
+        self._ready_timeout = READY_TIMEOUT
+        self._use_reader = False  # Restart the background reader after reconnecting
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, port: str, baudrate: int = BAUDRATE, ready_timeout: float = READY_TIMEOUT,
+              identity: Optional[PortIdentity] = None) -> None:
+        """Supervise the link of an already connected controller, returns at once
+            Pass the port's identity if known (e.g. from a PortInventory), otherwise the watcher
+            thread looks it up, as enumerating the ports can take hundreds of milliseconds"""
+        self.stop()
+        self.port = port
+        self.identity = identity
+        self._baudrate = baudrate
+        self._ready_timeout = ready_timeout
+        self._use_reader = self.controller.is_reader_running()
+        self._set_state(CONNECTED)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="LinkSupervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop supervising, the controller is left as it is
+            Returns within a fraction of a second even mid-reconnect, the ready wait watches the stop event"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._set_state(STOPPED)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            if self.on_state_change is not None:
+                self.on_state_change(state)
+
+    def _watch(self) -> None:
+        """Body of the watcher thread"""
+        if self.identity is None:
+            self.identity = port_identity(self.port)
+
+        while not self._stop.is_set():
+            if self.controller.is_connected():
+                self._stop.wait(LINK_CHECK_INTERVAL)
+                continue
+
+            lost_at = time.monotonic()
+            print(f"Link to {self.port} lost, reconnecting")
+            self._set_state(RECONNECTING)
+            # Keep the recorder and history, drop the dead port and its reader
+            self.controller.disconnect()
+
+            if self._reconnect():
+                if self._use_reader:
+                    self.controller.start_reader()
+                if self.command_queue is not None:
+                    replayed = self.command_queue.replay()
+                    print(f"Replaying {replayed} actuator command(s)")
+                self.reconnects += 1
+                self.last_downtime = time.monotonic() - lost_at
+                print(f"Reconnected to {self.port} after {self.last_downtime:.2f} s")
+                self._set_state(CONNECTED)
+
+    def _reconnect(self) -> bool:
+        """Wait for the device to reappear and connect to it, False if stopped meanwhile"""
+        backoff = BACKOFF_INITIAL
+        while not self._stop.is_set():
+            port = find_port(self.port, self.identity)
+            if port is None:
+                # Unplugged, watch the port list
+                self._stop.wait(PORT_POLL_INTERVAL)
+                continue
+
+            if self.controller.connect(port, self._baudrate, self._ready_timeout, cancel=self._stop):
+                if self.controller.ready:
+                    self.port = port
+                    return True
+                # The port opened but the board stays silent: do not replay commands into it
+                self.controller.disconnect()
+
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+        return False
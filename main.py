@@ -1,32 +1,78 @@
-import customtkinter as ctk
-from frames import login_frame, main_frame_dashboard, user_select_frame
-from authentication.perm_manager import PermissionManager
+import importlib
+import sys
+from startup_profiler import FRAME, profiler
+
+# Opt-in startup profiling, enabled before the imports below so they are timed too
+profiler.enable_if_requested(sys.argv)
+
+import customtkinter as ctk  # noqa: E402
+from authentication.perm_manager import PermissionManager  # noqa: E402
+
+
+# Frames by name: module and class, imported and built on first use (see App.get_frame)
+FRAMES = {
+    "user_select": ("frames.user_select_frame", "UserSelectFrame"),
+    "login": ("frames.login_frame", "LoginFrame"),
+    "main": ("frames.main_frame_dashboard", "MainFrameDashboard"),
+}
+PREWARM_DELAY = 500  # ms after the first screen before the other frames are built in the background
 
 
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, prewarm=True):
         super().__init__()
         self.perm_manager = PermissionManager()
         self.current_user = None
+        self.frames = {}  # Frames built so far, by name
 
         self.title("Parking Lot Manager")
         self.geometry("1920x1080")
 
-        # Initialize frames (all will be placed at the same location, stacked)
-        self.user_select_frame = user_select_frame.UserSelectFrame(self)
-        self.login_frame = login_frame.LoginFrame(self)
-        self.main_frame_dashboard = main_frame_dashboard.MainFrameDashboard(self)
-
-        # Show user selection frame by default
+        # Show user selection frame by default, the other frames are built when first shown
         self.show_user_select()
 
+        # Build the rest once the first screen is up, so switching to them does not stall
+        if prewarm:
+            self.after(PREWARM_DELAY, self.prewarm)
+
+    def get_frame(self, name):
+        """The frame called name, built (and its module imported) the first time it is asked for
+            The dashboard pulls in pyserial and the telemetry stack and decodes full-HD images,
+            none of which the first screen needs"""
+        frame = self.frames.get(name)
+        if frame is None:
+            module_name, class_name = FRAMES[name]
+            frame_class = getattr(importlib.import_module(module_name), class_name)
+            with profiler.span(class_name, FRAME):
+                frame = self.frames[name] = frame_class(self)
+        return frame
+
+    def prewarm(self):
+        """Build the next frame not built yet, one at a time so the loop handles input in between"""
+        for name in FRAMES:
+            if name not in self.frames:
+                self.get_frame(name)
+                self.after(PREWARM_DELAY, self.prewarm)
+                return
+
+    @property
+    def user_select_frame(self):
+        return self.get_frame("user_select")
+
+    @property
+    def login_frame(self):
+        return self.get_frame("login")
+
+    @property
+    def main_frame_dashboard(self):
+        return self.get_frame("main")
+
     def show_frame(self, frame_to_show):
         """Generic method to switch between frames"""
         # Hide all frames
-        self.user_select_frame.place_forget()
-        self.login_frame.place_forget()
-        self.main_frame_dashboard.place_forget()
-        
+        for frame in self.frames.values():
+            frame.place_forget()
+
         # Show the requested frame (full screen)
         frame_to_show.place(x=0, y=0, relwidth=1, relheight=1)
 
@@ -50,4 +96,7 @@ class App(ctk.CTk):
 if __name__ == "__main__":
     app = App()
     app.attributes("-fullscreen", "True")
-    app.mainloop()
\ No newline at end of file
+    if profiler.enabled:
+        # The first screen is drawn by the idle callbacks queued so far
+        app.after_idle(profiler.report)
+    app.mainloop()
@@ -0,0 +1,100 @@
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+import serial.tools.list_ports
+
+
+# Inventory settings
+SCAN_INTERVAL = 2.0  # seconds between background scans
+
+
+class PortInfo(NamedTuple):
+    """A serial port and its metadata as reported by serial.tools.list_ports"""
+    device: str
+    description: str
+    vid: Optional[int]
+    pid: Optional[int]
+    serial_number: Optional[str]
+
+    def is_usb(self) -> bool:
+        return self.vid is not None
+
+    def label(self) -> str:
+        """Example: "COM3 - USB JTAG/serial debug unit (303A:1001)" """
+        usb = f" ({self.vid:04X}:{self.pid:04X})" if self.vid is not None and self.pid is not None else ""
+        return f"{self.device} - {self.description}{usb}"
+
+
+def scan_ports() -> Dict[str, PortInfo]:
+    """Enumerate the serial ports, can take hundreds of milliseconds on some machines"""
+    return {
+        info.device: PortInfo(info.device, info.description, info.vid, info.pid, info.serial_number)
+        for info in serial.tools.list_ports.comports()
+    }
+
+
+class PortInventory:
+    """Serial port list kept up to date by a background thread
+        Readers get the cached result at once and never wait for an enumeration. version
+        changes after the first scan (even one finding no port) and then only when the set of
+        ports (or their metadata) changes, so a GUI can poll it cheaply and rebuild its widgets
+        only on change"""
+    def __init__(self, interval: float = SCAN_INTERVAL,
+                 on_change: Optional[Callable[[Dict[str, PortInfo]], None]] = None):
+        self.interval = interval
+        self.on_change = on_change  # Called from the scanning thread with the new ports
+        self.version = 0  # Incremented after the first scan and on every change
+        self.scanned = False  # At least one scan completed
+
+        self._ports: Dict[str, PortInfo] = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PortInventory":
+        """Start scanning in the background, the first scan begins at once"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._scan_loop, name="PortInventory", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def refresh(self) -> None:
+        """Ask for a scan now instead of at the next interval, returns at once"""
+        self._wakeup.set()
+
+    def ports(self) -> Dict[str, PortInfo]:
+        """Cached ports by device name"""
+        return self._ports
+
+    def devices(self) -> List[str]:
+        """Cached device names, USB devices first"""
+        return sorted(self._ports, key=lambda device: (not self._ports[device].is_usb(), device))
+
+    def _scan_loop(self) -> None:
+        """Body of the scanning thread"""
+        while not self._stop.is_set():
+            # Cleared before scanning, so a refresh() arriving during the scan asks for another one
+            self._wakeup.clear()
+            try:
+                ports = scan_ports()
+            except Exception as e:
+                print(f"Error listing serial ports: {e}")
+                ports = self._ports
+
+            if ports != self._ports or not self.scanned:
+                # Swap the whole dict so readers never see a half-built one, and mark the
+                # inventory scanned before a reader can see the new version
+                self._ports = ports
+                self.scanned = True
+                self.version += 1
+                if self.on_change is not None:
+                    self.on_change(ports)
+
+            self._wakeup.wait(self.interval)
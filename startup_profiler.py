@@ -0,0 +1,225 @@
+import importlib.abc
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+
+# Profiler settings
+PROFILE_FLAG = "--profile-startup"
+PROFILE_ENV = "SPKL_PROFILE_STARTUP"
+PROFILE_DIR = "database/profiles"
+TOP_SPANS = 15  # Slowest spans listed per category in the text report
+
+# Span categories
+IMPORT = "import"
+FRAME = "frame"
+IMAGE = "image"
+OPACITY = "opacity"
+
+
+class Span(NamedTuple):
+    """A timed section, times in seconds since the profiler was enabled"""
+    name: str
+    category: str
+    start: float
+    duration: float
+    self_time: float  # duration minus the spans nested in it
+    thread: int
+
+
+class _TimingLoader:
+    """Wraps a module's loader to time its execution, everything else is delegated"""
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler.span(module.__name__, IMPORT):
+            self._loader.exec_module(module)
+        self._profiler._patch(module.__name__)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """First entry of sys.meta_path: asks the other finders and wraps the loader they return"""
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimingLoader(spec.loader, self.profiler)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """Opt-in profiler of the GUI startup: python main.py --profile-startup, or SPKL_PROFILE_STARTUP=1
+        Records the wall time of every module import, frame constructor, image decode and
+        pywinstyles.set_opacity() call until the first screen is drawn, then writes a text report
+        and a Chrome trace (chrome://tracing or ui.perfetto.dev) to PROFILE_DIR.
+        Spans nest per thread, so an import's self time excludes the imports it triggered.
+        While disabled span() returns a shared no-op context manager and nothing is hooked"""
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[Span] = []
+        self.marks: Dict[str, float] = {}
+        self._origin = 0.0
+        self._finder: Optional[_TimingFinder] = None
+        self._wrapped: Dict[str, List[tuple]] = {}  # module -> [(attribute, category, original)]
+        self._stacks = threading.local()  # Child time of the open spans of each thread
+        self._lock = threading.Lock()
+
+    def enable_if_requested(self, argv: Sequence[str] = (), environ=os.environ) -> bool:
+        """Enable if PROFILE_FLAG is in argv or PROFILE_ENV is set to something other than 0"""
+        if PROFILE_FLAG in argv or environ.get(PROFILE_ENV, "0") not in ("", "0"):
+            self.enable()
+        return self.enabled
+
+    def enable(self) -> None:
+        """Start recording: hook the import system and the functions to time"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._origin = time.perf_counter()
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+        self.wrap("pywinstyles", "set_opacity", OPACITY)
+
+    def disable(self) -> None:
+        """Stop recording and undo the hooks, the spans recorded so far stay"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        for module_name, wrapped in self._wrapped.items():
+            module = sys.modules.get(module_name)
+            for attribute, _, original in wrapped:
+                if module is not None and original is not None:
+                    setattr(module, attribute, original)
+        self._wrapped.clear()
+
+    def wrap(self, module_name: str, attribute: str, category: str) -> None:
+        """Time every call of module.attribute, now or as soon as the module is imported"""
+        self._wrapped.setdefault(module_name, []).append((attribute, category, None))
+        if module_name in sys.modules:
+            self._patch(module_name)
+
+    def _patch(self, module_name: str) -> None:
+        """Replace the functions to time in a module that was just imported"""
+        wrapped = self._wrapped.get(module_name)
+        module = sys.modules.get(module_name)
+        if not wrapped or module is None:
+            return
+        for i, (attribute, category, original) in enumerate(wrapped):
+            function = getattr(module, attribute, None)
+            if original is not None or function is None:
+                continue
+            setattr(module, attribute, self._timed(function, f"{module_name}.{attribute}", category))
+            wrapped[i] = (attribute, category, function)
+
+    def _timed(self, function: Callable, name: str, category: str) -> Callable:
+        def timed(*args, **kwargs):
+            with self.span(name, category):
+                return function(*args, **kwargs)
+        return timed
+
+    def span(self, name: str, category: str):
+        """Context manager timing a section
+            Example: with profiler.span("LoginFrame", FRAME): frame = LoginFrame(app)"""
+        if not self.enabled:
+            return _NOT_RECORDING
+        return self._span(name, category)
+
+    @contextmanager
+    def _span(self, name: str, category: str):
+        stack = getattr(self._stacks, "children", None)
+        if stack is None:
+            stack = self._stacks.children = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += duration
+            with self._lock:
+                self.spans.append(Span(name, category, start - self._origin, duration,
+                                       duration - children, threading.get_ident()))
+
+    def mark(self, name: str) -> None:
+        """Record a moment, e.g. "first paint" """
+        if self.enabled:
+            self.marks[name] = time.perf_counter() - self._origin
+
+    def report(self, directory: str = PROFILE_DIR) -> Optional[str]:
+        """Mark the first paint, stop recording and write the text report and the Chrome trace
+            Returns the path of the text report (without extension), or None if not enabled"""
+        if not self.enabled:
+            return None
+        self.mark("first paint")
+        self.disable()
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("startup-%Y%m%d-%H%M%S"))
+        with open(path + ".txt", "w") as file:
+            file.write(self.format_text())
+        with open(path + ".json", "w") as file:
+            json.dump(self.chrome_trace(), file)
+        print(f"Startup profile written to {path}.txt and {path}.json")
+        return path
+
+    def format_text(self) -> str:
+        """Totals per category and the slowest spans of each"""
+        lines = [f"{name}: {seconds * 1000:.1f} ms" for name, seconds in self.marks.items()]
+        for category in (IMPORT, FRAME, IMAGE, OPACITY):
+            spans = [span for span in self.spans if span.category == category]
+            if not spans:
+                continue
+            total = sum(span.self_time for span in spans)
+            lines.append(f"\n{category}: {len(spans)} spans, {total * 1000:.1f} ms self time")
+            lines.append(f"  {'name':<48}{'total ms':>10}{'self ms':>10}")
+            for span in sorted(spans, key=lambda span: span.duration, reverse=True)[:TOP_SPANS]:
+                lines.append(f"  {span.name[:48]:<48}{span.duration * 1000:>10.1f}{span.self_time * 1000:>10.1f}")
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self) -> Dict[str, object]:
+        """The spans in the Chrome trace event format, times in microseconds"""
+        pid = os.getpid()
+        events = [{"name": span.name, "cat": span.category, "ph": "X", "ts": span.start * 1e6,
+                   "dur": span.duration * 1e6, "pid": pid, "tid": span.thread} for span in self.spans]
+        events += [{"name": name, "ph": "i", "s": "g", "ts": seconds * 1e6, "pid": pid, "tid": 0}
+                   for name, seconds in self.marks.items()]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class _NotRecording:
+    """What span() returns while the profiler is disabled"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOT_RECORDING = _NotRecording()
+
+# The profiler of this process
+profiler = StartupProfiler()
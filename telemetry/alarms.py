@@ -0,0 +1,260 @@
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+from telemetry.events import ChangeEvent, EventBus, Subscription
+
+Value = Union[int, float, str, None]
+Values = Dict[str, Value]
+
+# Alarm severities
+INFO = "info"
+WARNING = "warning"
+CRITICAL = "critical"
+
+
+class Condition:
+    """A test on the telemetry that knows which fields it reads, so rules can be indexed by field"""
+    def __init__(self, fields: Sequence[str], test: Callable[[Values], bool], description: str):
+        self.fields = tuple(fields)
+        self.test = test
+        self.description = description
+
+    def __call__(self, values: Values) -> bool:
+        try:
+            return bool(self.test(values))
+        except TypeError:
+            # A field is missing (None) or not numeric yet
+            return False
+
+    def __repr__(self) -> str:
+        return self.description
+
+
+def equals(field: str, value: Value) -> Condition:
+    return Condition((field,), lambda values: values.get(field) == value, f"{field} == {value}")
+
+
+def above(field: str, threshold: float) -> Condition:
+    return Condition((field,), lambda values: values.get(field) > threshold, f"{field} > {threshold}")
+
+
+def below(field: str, threshold: float) -> Condition:
+    return Condition((field,), lambda values: values.get(field) < threshold, f"{field} < {threshold}")
+
+
+def all_of(*conditions: Condition) -> Condition:
+    fields = tuple(dict.fromkeys(field for condition in conditions for field in condition.fields))
+    return Condition(fields, lambda values: all(condition(values) for condition in conditions),
+                     " and ".join(map(repr, conditions)))
+
+
+def any_of(*conditions: Condition) -> Condition:
+    fields = tuple(dict.fromkeys(field for condition in conditions for field in condition.fields))
+    return Condition(fields, lambda values: any(condition(values) for condition in conditions),
+                     " or ".join(map(repr, conditions)))
+
+
+class Rule:
+    """A declarative alarm rule
+        The alarm raises on the rising edge of condition once it has held for hold seconds
+        (debounce / "Fire == 1 for 300 ms"), and clears once clear_condition (default: not condition)
+        has held for clear_hold seconds. A separate clear_condition gives hysteresis, e.g.
+        condition=below("LDR", 1000), clear_condition=above("LDR", 1200).
+        commands are sent when the alarm raises, clear_commands when it clears"""
+    def __init__(self, name: str, condition: Condition, message: str, severity: str = WARNING,
+                 hold: float = 0.0, clear_condition: Optional[Condition] = None, clear_hold: float = 0.0,
+                 commands: Sequence[str] = (), clear_commands: Sequence[str] = ()):
+        self.name = name
+        self.condition = condition
+        self.clear_condition = clear_condition
+        self.message = message
+        self.severity = severity
+        self.hold = hold
+        self.clear_hold = clear_hold
+        self.commands = tuple(commands)
+        self.clear_commands = tuple(clear_commands)
+
+    def fields(self) -> Tuple[str, ...]:
+        """Every field the rule reads"""
+        fields = self.condition.fields + (self.clear_condition.fields if self.clear_condition else ())
+        return tuple(dict.fromkeys(fields))
+
+    def should_clear(self, values: Values) -> bool:
+        if self.clear_condition is not None:
+            return self.clear_condition(values)
+        return not self.condition(values)
+
+
+class Alert(NamedTuple):
+    """An alarm raising (active=True) or clearing, timestamps are time.monotonic() values"""
+    rule: str
+    message: str
+    severity: str
+    active: bool
+    timestamp: float  # When the engine decided
+    trigger_time: float  # Arrival of the frame (or end of the hold time) that decided it
+
+    @property
+    def latency_ms(self) -> float:
+        return (self.timestamp - self.trigger_time) * 1000
+
+
+# Alarms for the sensors of FINAL.ino. Parking sensors read 1 when the space is free
+DEFAULT_RULES = [
+    Rule("fire", equals("Fire", 1), "FIRE DETECTED", CRITICAL, hold=0.3, clear_hold=2.0),
+    Rule("rain", equals("Rain", 1), "Rain detected", INFO, hold=1.0, clear_hold=10.0),
+    Rule("lot_full", all_of(equals("F1", 0), equals("F2", 0), equals("F3", 0)), "Parking lot full", WARNING,
+         hold=1.0, clear_hold=1.0),
+]
+
+# Rule states
+_IDLE = 0  # Condition false
+_RAISING = 1  # Condition true, waiting for hold
+_ACTIVE = 2  # Alarm raised
+_CLEARING = 3  # Alarm raised, clear condition true, waiting for clear_hold
+
+
+class AlarmEngine:
+    """Evaluates alarm rules incrementally on every telemetry change
+        Subscribes inline to the fields the rules read: a change only evaluates the rules indexed
+        under that field, on the reader thread, so an alarm without hold time is decided in
+        microseconds after the frame arrives. Hold timers run on a small timer thread, so they
+        fire on time even when no further frame arrives.
+        on_alert(alert) and send_command(command) are called from those threads and must return quickly"""
+    def __init__(self, rules: Sequence[Rule] = DEFAULT_RULES,
+                 on_alert: Optional[Callable[[Alert], None]] = None,
+                 send_command: Optional[Callable[[str], object]] = None):
+        self.rules = list(rules)
+        self.on_alert = on_alert
+        self.send_command = send_command
+        self.max_latency_ms = 0.0  # Worst frame-to-decision latency seen
+
+        self._by_field: Dict[str, List[Rule]] = {}
+        for rule in self.rules:
+            for field in rule.fields():
+                self._by_field.setdefault(field, []).append(rule)
+
+        self._values: Values = {}  # Latest value of every indexed field
+        self._state: Dict[str, int] = {rule.name: _IDLE for rule in self.rules}
+        self._generation: Dict[str, int] = {rule.name: 0 for rule in self.rules}  # Invalidates old timers
+        self._lock = threading.Lock()
+
+        self._timers: List[Tuple[float, int, str, int]] = []  # Heap of (deadline, seq, rule, generation)
+        self._timer_seq = 0
+        self._timer_wakeup = threading.Condition(self._lock)
+        self._timer_thread: Optional[threading.Thread] = None
+        self._stop = False
+        self._subscription: Optional[Subscription] = None
+        self._bus: Optional[EventBus] = None
+
+    def attach(self, bus: EventBus, current: Optional[Values] = None) -> None:
+        """Start evaluating the changes published on a controller's event bus
+            current is the controller's cache, to evaluate the rules against the present state"""
+        self.detach()
+        self._stop = False
+        self._timer_thread = threading.Thread(target=self._timer_loop, name="AlarmEngine", daemon=True)
+        self._timer_thread.start()
+        if current:
+            now = time.monotonic()
+            for field, value in current.items():
+                self.on_change(ChangeEvent(field, None, value, now))
+        self._bus = bus
+        self._subscription = bus.subscribe(self.on_change, tuple(self._by_field))
+
+    def detach(self) -> None:
+        """Stop evaluating, active alarms stay as they are"""
+        if self._subscription is not None:
+            self._bus.unsubscribe(self._subscription)
+            self._subscription = None
+        with self._lock:
+            self._stop = True
+            self._timer_wakeup.notify()
+        if self._timer_thread is not None:
+            self._timer_thread.join()
+            self._timer_thread = None
+
+    def active_alarms(self) -> List[Rule]:
+        return [rule for rule in self.rules if self._state[rule.name] in (_ACTIVE, _CLEARING)]
+
+    def on_change(self, event: ChangeEvent) -> None:
+        """Evaluate the rules reading the changed field"""
+        rules = self._by_field.get(event.field)
+        if not rules:
+            return
+        alerts = []
+        with self._lock:
+            self._values[event.field] = event.new
+            for rule in rules:
+                alert = self._evaluate(rule, event.timestamp)
+                if alert is not None:
+                    alerts.append(alert)
+        self._emit(alerts)
+
+    def _evaluate(self, rule: Rule, now: float) -> Optional[Alert]:
+        """Advance a rule's state machine, holding the lock"""
+        state = self._state[rule.name]
+        if state == _IDLE and rule.condition(self._values):
+            if rule.hold <= 0:
+                return self._transition(rule, _ACTIVE, now)
+            self._transition(rule, _RAISING, now, rule.hold)
+        elif state == _RAISING and not rule.condition(self._values):
+            self._transition(rule, _IDLE, now)
+        elif state == _ACTIVE and rule.should_clear(self._values):
+            if rule.clear_hold <= 0:
+                return self._transition(rule, _IDLE, now)
+            self._transition(rule, _CLEARING, now, rule.clear_hold)
+        elif state == _CLEARING and not rule.should_clear(self._values):
+            self._transition(rule, _ACTIVE, now)
+        return None
+
+    def _transition(self, rule: Rule, state: int, trigger_time: float,
+                    timer: Optional[float] = None) -> Optional[Alert]:
+        """Enter a state, arming a timer for it or reporting the raise / clear it means"""
+        previous = self._state[rule.name]
+        self._state[rule.name] = state
+        self._generation[rule.name] += 1
+        if timer is not None:
+            self._timer_seq += 1
+            heapq.heappush(self._timers, (trigger_time + timer, self._timer_seq, rule.name,
+                                          self._generation[rule.name]))
+            self._timer_wakeup.notify()
+            return None
+
+        raised = state == _ACTIVE and previous in (_IDLE, _RAISING)
+        cleared = state == _IDLE and previous in (_ACTIVE, _CLEARING)
+        if not raised and not cleared:
+            return None
+        return Alert(rule.name, rule.message, rule.severity, raised, time.monotonic(), trigger_time)
+
+    def _timer_loop(self) -> None:
+        """Body of the timer thread: complete the hold times that ran out"""
+        rules = {rule.name: rule for rule in self.rules}
+        while True:
+            alerts = []
+            with self._lock:
+                while not self._stop and (not self._timers or self._timers[0][0] > time.monotonic()):
+                    self._timer_wakeup.wait(self._timers[0][0] - time.monotonic() if self._timers else None)
+                if self._stop:
+                    return
+                deadline, _, name, generation = heapq.heappop(self._timers)
+                if generation == self._generation[name]:
+                    # Still in the state that armed it, the hold time is complete
+                    state = self._state[name]
+                    alert = self._transition(rules[name], _ACTIVE if state == _RAISING else _IDLE, deadline)
+                    if alert is not None:
+                        alerts.append(alert)
+            self._emit(alerts)
+
+    def _emit(self, alerts: List[Alert]) -> None:
+        """Report alerts and send their commands, outside the lock"""
+        for alert in alerts:
+            self.max_latency_ms = max(self.max_latency_ms, alert.latency_ms)
+            print(f"Alarm {'raised' if alert.active else 'cleared'}: {alert.message}")
+            if self.on_alert is not None:
+                self.on_alert(alert)
+
+            rule = next(rule for rule in self.rules if rule.name == alert.rule)
+            if self.send_command is not None:
+                for command in rule.commands if alert.active else rule.clear_commands:
+                    self.send_command(command)
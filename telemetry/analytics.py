@@ -0,0 +1,191 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Union
+from telemetry.events import INLINE, ChangeEvent, EventBus, Subscription
+
+
+# Analytics settings
+SLOT_FIELDS = ("F1", "F2", "F3")  # Parking sensors, 1 while the space is free
+ENTRY_FIELD = "In"  # 1 while a car is at the entrance barrier
+EXIT_FIELD = "Out"  # 1 while a car is at the exit barrier
+WINDOWS = (60.0, 900.0, 3600.0)  # seconds: 1 min, 15 min, 1 h
+WINDOW_BUCKETS = 60  # Buckets per window, the window slides one bucket at a time
+
+
+class SlidingWindow:
+    """Time-weighted sum, count and peak over the last window seconds, in constant memory
+        The window is split into buckets; moving forward in time zeroes the buckets that fall
+        out, so every update costs O(1) amortised whatever the sample rate or the uptime"""
+    def __init__(self, window: float, buckets: int = WINDOW_BUCKETS):
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.total = 0.0  # Sum of value * seconds
+        self.seconds = 0.0  # Seconds covered
+        self.count = 0  # Events counted
+        self._totals = [0.0] * buckets
+        self._seconds = [0.0] * buckets
+        self._counts = [0] * buckets
+        self._peaks: List[Optional[float]] = [None] * buckets
+        self._head: Optional[int] = None  # Absolute number of the newest bucket
+
+    def advance(self, t: float) -> None:
+        """Move the window so that it ends at t, dropping the buckets that fall out"""
+        index = int(t // self.width)
+        if self._head is None:
+            self._head = index
+            return
+        if index <= self._head:
+            return
+        for absolute in range(self._head + 1, min(index, self._head + self.buckets) + 1):
+            slot = absolute % self.buckets
+            self._totals[slot] = 0.0
+            self._seconds[slot] = 0.0
+            self._counts[slot] = 0
+            self._peaks[slot] = None
+        self._head = index
+        # Re-add the buckets once per bucket width rather than subtracting, no float drift over days
+        self.total = sum(self._totals)
+        self.seconds = sum(self._seconds)
+        self.count = sum(self._counts)
+
+    def add_interval(self, value: float, start: float, end: float) -> None:
+        """A value held from start to end, split over the buckets it spans (at most one window's worth)"""
+        start = max(start, end - self.window)
+        if end <= start:
+            return
+        self.advance(end)
+        first = max(int(start // self.width), self._head - self.buckets + 1)
+        for absolute in range(first, self._head + 1):
+            overlap = min(end, (absolute + 1) * self.width) - max(start, absolute * self.width)
+            if overlap <= 0:
+                continue
+            slot = absolute % self.buckets
+            self._totals[slot] += value * overlap
+            self._seconds[slot] += overlap
+            self.total += value * overlap
+            self.seconds += overlap
+            peak = self._peaks[slot]
+            if peak is None or value > peak:
+                self._peaks[slot] = value
+
+    def add_event(self, t: float) -> None:
+        """Count one event at t"""
+        self.advance(t)
+        self._counts[self._head % self.buckets] += 1
+        self.count += 1
+
+    def mean(self) -> Optional[float]:
+        """Time-weighted mean of the values in the window"""
+        return self.total / self.seconds if self.seconds > 0 else None
+
+    def peak(self) -> Optional[float]:
+        """Highest value held in the window (scans the buckets, for display only)"""
+        peaks = [peak for peak in self._peaks if peak is not None]
+        return max(peaks) if peaks else None
+
+    def rate_per_minute(self) -> float:
+        """Events per minute over the window"""
+        return self.count * 60.0 / self.window
+
+
+class OccupancyAnalytics:
+    """Live occupancy statistics from the parking and barrier sensors
+        Vehicles in/out per minute (rising edges of In / Out), utilisation of every space and
+        peak / average number of occupied spaces over sliding windows, plus all-time figures.
+        Updated from change events only: a sensor holding its value costs nothing per frame,
+        the time it held it is accounted for at the next change or read"""
+    def __init__(self, slots: Sequence[str] = SLOT_FIELDS, windows: Sequence[float] = WINDOWS,
+                 buckets: int = WINDOW_BUCKETS):
+        self.slots = tuple(slots)
+        self.windows = tuple(windows)
+        self.entries = {window: SlidingWindow(window, buckets) for window in self.windows}
+        self.exits = {window: SlidingWindow(window, buckets) for window in self.windows}
+        self.utilisation = {slot: {window: SlidingWindow(window, buckets) for window in self.windows}
+                            for slot in self.slots}
+        self.occupancy = {window: SlidingWindow(window, buckets) for window in self.windows}
+        self.total_entries = 0
+        self.total_exits = 0
+        self.peak_occupancy = 0
+        self._occupied_seconds = 0.0  # All-time sum of occupied spaces * seconds
+        self._observed_seconds = 0.0
+
+        self._occupied: Dict[str, int] = {}  # 1 if the space is taken, for spaces seen so far
+        self._since: Optional[float] = None  # Start of the interval not accounted for yet
+        self._lock = threading.Lock()
+        self._bus: Optional[EventBus] = None
+        self._subscription: Optional[Subscription] = None
+
+    def attach(self, bus: EventBus, current: Optional[Dict[str, Union[int, float, str, None]]] = None) -> None:
+        """Start following a controller's event bus, current is its cache (the present state)"""
+        self.detach()
+        if current:
+            now = time.monotonic()
+            for slot in self.slots:
+                if slot in current:
+                    self.on_change(ChangeEvent(slot, None, current[slot], now))
+        self._bus = bus
+        self._subscription = bus.subscribe(self.on_change, self.slots + (ENTRY_FIELD, EXIT_FIELD), dispatch=INLINE)
+
+    def detach(self) -> None:
+        if self._subscription is not None:
+            self._bus.unsubscribe(self._subscription)
+            self._subscription = None
+        with self._lock:
+            self._since = None  # Time while detached is not observed
+
+    def _account(self, now: float) -> None:
+        """Book the interval since the last change with the state it had, holding the lock"""
+        if self._since is not None and now > self._since:
+            start = self._since
+            occupied = sum(self._occupied.values())
+            for slot, taken in self._occupied.items():
+                for window in self.utilisation[slot].values():
+                    window.add_interval(taken, start, now)
+            for window in self.occupancy.values():
+                window.add_interval(occupied, start, now)
+            self._occupied_seconds += occupied * (now - start)
+            self._observed_seconds += now - start
+        # Never moves back: an event older than the last snapshot must not book that interval again
+        self._since = now if self._since is None else max(self._since, now)
+
+    def on_change(self, event: ChangeEvent) -> None:
+        with self._lock:
+            if event.field in self.utilisation:
+                self._account(event.timestamp)
+                self._occupied[event.field] = 0 if event.new else 1
+                self.peak_occupancy = max(self.peak_occupancy, sum(self._occupied.values()))
+            elif event.new == 1 and event.old == 0:
+                # A car arrived at a barrier
+                if event.field == ENTRY_FIELD:
+                    self.total_entries += 1
+                    windows = self.entries
+                else:
+                    self.total_exits += 1
+                    windows = self.exits
+                for window in windows.values():
+                    window.add_event(event.timestamp)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, object]:
+        """Every statistic as of now, the windows are brought up to date first"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._account(now)
+            for window in self.windows:
+                self.entries[window].advance(now)
+                self.exits[window].advance(now)
+            return {
+                "occupied": sum(self._occupied.values()),
+                "spaces": len(self.slots),
+                "entries_per_min": {window: self.entries[window].rate_per_minute() for window in self.windows},
+                "exits_per_min": {window: self.exits[window].rate_per_minute() for window in self.windows},
+                "utilisation": {slot: {window: windows[window].mean() for window in self.windows}
+                                for slot, windows in self.utilisation.items()},
+                "average_occupancy": {window: self.occupancy[window].mean() for window in self.windows},
+                "peak_occupancy": {window: self.occupancy[window].peak() for window in self.windows},
+                "total_entries": self.total_entries,
+                "total_exits": self.total_exits,
+                "all_time_peak": self.peak_occupancy,
+                "all_time_average": (self._occupied_seconds / self._observed_seconds
+                                     if self._observed_seconds > 0 else None),
+            }
@@ -0,0 +1,66 @@
+import binascii
+import struct
+from typing import Dict, Optional, Tuple
+
+
+# Binary telemetry frame, sent by FINAL.ino after the TELEMETRY_BINARY command
+#   offset 0  sync      2 bytes  A5 5A
+#   offset 2  length    uint8    payload length (8)
+#   offset 3  seq       uint8    frame counter, wraps at 256
+#   offset 4  millis    uint32   device uptime in ms
+#   offset 8  flags     uint8    one bit per digital field, see FLAG_BITS
+#   offset 9  ldr       uint16   analogRead(LDR_PIN)
+#   offset 11 crc       uint16   CRC-16/CCITT-FALSE over length + payload
+# All integers are little-endian. 13 bytes against ~70 for the text frame
+SYNC = b"\xa5\x5a"
+PAYLOAD_FORMAT = "<BIBH"
+PAYLOAD_SIZE = struct.calcsize(PAYLOAD_FORMAT)
+FRAME_SIZE = len(SYNC) + 1 + PAYLOAD_SIZE + 2
+CRC_INIT = 0xFFFF
+
+# Bit position of each digital field inside the flags byte, in text frame order.
+# LDR has no bit, it is carried in its own field
+FIELD_BITS = (
+    ("F1", 0),
+    ("F2", 1),
+    ("F3", 2),
+    ("In", 3),
+    ("Out", 4),
+    ("LDR", None),
+    ("Rain", 5),
+    ("Fire", 6),
+)
+
+_HEADER = struct.Struct("<2sB")
+_PAYLOAD = struct.Struct(PAYLOAD_FORMAT)
+_CRC = struct.Struct("<H")
+
+
+def decode_frame(buffer, offset: int = 0) -> Optional[Tuple[int, int, Dict[str, int]]]:
+    """Decode the frame starting at buffer[offset] without copying it
+        Returns (seq, millis, values) with the same keys as the text frame,
+        or None if the bytes there are not a valid frame"""
+    sync, length = _HEADER.unpack_from(buffer, offset)
+    if sync != SYNC or length != PAYLOAD_SIZE:
+        return None
+
+    crc_offset = offset + FRAME_SIZE - 2
+    with memoryview(buffer) as view:
+        crc = binascii.crc_hqx(view[offset + len(SYNC):crc_offset], CRC_INIT)
+    if crc != _CRC.unpack_from(buffer, crc_offset)[0]:
+        return None
+
+    seq, millis, flags, ldr = _PAYLOAD.unpack_from(buffer, offset + len(SYNC) + 1)
+    values = {name: ldr if bit is None else (flags >> bit) & 1 for name, bit in FIELD_BITS}
+    return seq, millis, values
+
+
+def encode_frame(seq: int, millis: int, values: Dict[str, int]) -> bytes:
+    """Build a frame the way FINAL.ino does (used by emulators and benchmarks)"""
+    flags = 0
+    for name, bit in FIELD_BITS:
+        if bit is not None and values.get(name):
+            flags |= 1 << bit
+
+    body = bytes([PAYLOAD_SIZE]) + _PAYLOAD.pack(seq & 0xFF, millis & 0xFFFFFFFF, flags, values.get("LDR", 0))
+    return SYNC + body + _CRC.pack(binascii.crc_hqx(body, CRC_INIT))
@@ -0,0 +1,77 @@
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+
+class Column:
+    """Samples of one time bucket reduced to the first, lowest, highest and last value"""
+    __slots__ = ("index", "first", "low", "high", "last")
+
+    def __init__(self, index: int, value: float):
+        self.index = index  # Absolute bucket number, timestamp // bucket width
+        self.first = self.low = self.high = self.last = value
+
+
+class MinMaxDownsampler:
+    """Reduces a time series to one Column per bucket_width seconds, fed incrementally
+        With one bucket per pixel, a vertical stroke from low to high joined to its neighbours
+        through first / last draws the same picture as every sample would, spikes included,
+        so a chart costs one line per pixel column whatever the sample rate or history length.
+        Only the newest keep columns are kept; feeding new samples only touches the columns they fall in.
+        timestamps can be a memoryview of TelemetryHistory, the samples are never copied one by one"""
+    def __init__(self, bucket_width: float, keep: int):
+        if bucket_width <= 0 or keep < 1:
+            raise ValueError("bucket_width and keep must be positive")
+
+        self.bucket_width = bucket_width
+        self.keep = keep
+        self.columns: Deque[Column] = deque()
+
+    def add(self, timestamps: Sequence[float], values: Sequence[float]) -> Optional[int]:
+        """Feed samples in time order, returns the index of the oldest column that changed (None if none)
+            Samples older than the newest column are ignored, so feeding a row twice is harmless"""
+        columns = self.columns
+        width = self.bucket_width
+        changed = None
+
+        # One bisect and a min() / max() per bucket rather than Python code per sample
+        start = 0
+        if columns:
+            start = bisect_left(timestamps, columns[-1].index * width)
+        while start < len(timestamps):
+            index = int(timestamps[start] // width)
+            end = max(bisect_left(timestamps, (index + 1) * width, start), start + 1)
+            chunk = values[start:end]
+            low = min(chunk)
+            high = max(chunk)
+            if columns and columns[-1].index == index:
+                column = columns[-1]
+                column.low = min(column.low, low)
+                column.high = max(column.high, high)
+            elif columns and columns[-1].index > index:
+                start = end
+                continue
+            else:
+                column = Column(index, chunk[0])
+                column.low = low
+                column.high = high
+                columns.append(column)
+            column.last = chunk[-1]
+            if changed is None:
+                changed = index
+            start = end
+
+        if columns:
+            oldest = columns[-1].index - self.keep
+            while columns[0].index <= oldest:
+                columns.popleft()
+        return changed
+
+    def tail(self, index: int) -> Tuple[Optional[Column], List[Column]]:
+        """The columns from index on, oldest first, and the column just before them (None if none)"""
+        columns = []
+        for column in reversed(self.columns):
+            if column.index < index:
+                return column, columns[::-1]
+            columns.append(column)
+        return None, columns[::-1]
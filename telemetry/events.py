@@ -0,0 +1,176 @@
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+
+# Dispatch modes
+INLINE = "inline"  # Call the subscriber on the thread that read the frame
+TK = "tk"  # Queue the event and call the subscriber from the Tk event loop
+
+MAX_QUEUED = 10000  # Items a TkDispatcher holds while the Tk loop is stalled, the oldest are dropped beyond
+
+
+class ChangeEvent(NamedTuple):
+    """A field of the telemetry changed value
+        old is None the first time a field is seen, timestamp is a time.monotonic() value"""
+    field: str
+    old: Union[int, float, str, None]
+    new: Union[int, float, str, None]
+    timestamp: float
+
+
+Callback = Callable[[ChangeEvent], None]
+Predicate = Callable[[ChangeEvent], bool]
+
+
+class Subscription:
+    """Handle returned by EventBus.subscribe, pass it to unsubscribe"""
+    __slots__ = ("callback", "fields", "predicate", "dispatcher", "coalesce")
+
+    def __init__(self, callback: Callback, fields: Optional[Tuple[str, ...]], predicate: Optional[Predicate],
+                 dispatcher: Optional["TkDispatcher"], coalesce: bool = False):
+        self.callback = callback
+        self.fields = fields  # None for every field
+        self.predicate = predicate
+        self.dispatcher = dispatcher  # None for inline dispatch
+        self.coalesce = coalesce  # Only the latest change of each field per Tk flush
+
+
+class TkDispatcher:
+    """Moves events (or any other item, e.g. alarms) from a worker thread to the Tk loop of a widget
+        The first item of a burst schedules a single after_idle, which then delivers everything
+        posted by then. Items posted with a key are coalesced, only the latest one per
+        (callback, key) is delivered: a field that changed ten times since the last flush costs
+        one call. Other items are queued, at most max_queued of them (the oldest are dropped)"""
+    def __init__(self, widget, max_queued: int = MAX_QUEUED):
+        self.widget = widget
+        self.dropped = 0  # Items dropped because the queue was full
+        self._queue: Deque[Tuple[Callback, object]] = deque(maxlen=max_queued)
+        self._latest: Dict[Tuple[Callback, Hashable], object] = {}
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def post(self, callback: Callback, item, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is not None:
+                self._latest[(callback, key)] = item
+            else:
+                if len(self._queue) == self._queue.maxlen:
+                    self.dropped += 1
+                self._queue.append((callback, item))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.widget.after_idle(self._flush)
+        except RuntimeError:
+            # The Tk loop is gone (window closed)
+            with self._lock:
+                self._queue.clear()
+                self._latest.clear()
+
+    def _flush(self) -> None:
+        with self._lock:
+            self._scheduled = False
+            queued = list(self._queue)
+            self._queue.clear()
+            latest, self._latest = self._latest, {}
+        for callback, item in queued + [(callback, item) for (callback, _), item in latest.items()]:
+            try:
+                callback(item)
+            except Exception as e:
+                print(f"Error in telemetry subscriber: {e}")
+
+
+class EventBus:
+    """Publishes a ChangeEvent for every field whose value changed
+        Subscribers pick fields by name (indexed, so a frame only reaches the subscribers of the
+        fields it changed) and/or by predicate, and are called inline or from the Tk loop.
+        Frames are compared with the previous cache, unchanged fields produce nothing"""
+    def __init__(self):
+        self._by_field: Dict[str, List[Subscription]] = {}
+        self._any_field: List[Subscription] = []
+        self._dispatchers: Dict[int, TkDispatcher] = {}
+        self._lock = threading.Lock()  # Subscribing copies the lists, publishing reads them without it
+
+    def has_subscribers(self) -> bool:
+        return bool(self._by_field or self._any_field)
+
+    def subscribe(self, callback: Callback, fields: Union[str, Iterable[str], None] = None,
+                  predicate: Optional[Predicate] = None, dispatch: str = INLINE, widget=None,
+                  coalesce: bool = False) -> Subscription:
+        """Call callback(event) for changes of the given field(s) (every field if None) that pass predicate
+            With Tk dispatch, coalesce delivers only the latest change of each field per Tk flush
+            Example: bus.subscribe(on_fire, "Fire", lambda event: event.new == 1, dispatch=TK, widget=root)"""
+        if isinstance(fields, str):
+            fields = (fields,)
+        elif fields is not None:
+            fields = tuple(fields)
+
+        dispatcher = None
+        if dispatch == TK:
+            if widget is None:
+                raise ValueError("Tk dispatch needs a widget")
+            dispatcher = self._dispatchers.setdefault(id(widget), TkDispatcher(widget))
+        elif dispatch != INLINE:
+            raise ValueError(f"Unknown dispatch mode: {dispatch}")
+
+        subscription = Subscription(callback, fields, predicate, dispatcher, coalesce)
+        with self._lock:
+            if fields is None:
+                self._any_field = self._any_field + [subscription]
+            else:
+                for field in fields:
+                    self._by_field[field] = self._by_field.get(field, []) + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription.fields is None:
+                self._any_field = [other for other in self._any_field if other is not subscription]
+            else:
+                for field in subscription.fields:
+                    remaining = [other for other in self._by_field.get(field, []) if other is not subscription]
+                    if remaining:
+                        self._by_field[field] = remaining
+                    else:
+                        self._by_field.pop(field, None)
+
+            # Forget the dispatcher of a widget nobody listens on anymore
+            dispatcher = subscription.dispatcher
+            if dispatcher is not None and not any(
+                    other.dispatcher is dispatcher
+                    for group in [self._any_field, *self._by_field.values()] for other in group):
+                self._dispatchers.pop(id(dispatcher.widget), None)
+
+    def publish(self, previous: Dict[str, Union[int, float, str, None]],
+                values: Dict[str, Union[int, float, str, None]], timestamp: float) -> int:
+        """Publish the changes of a frame against the previous cache, returns the number of events"""
+        by_field = self._by_field
+        any_field = self._any_field
+        published = 0
+
+        for field, new in values.items():
+            old = previous.get(field)
+            if old == new and field in previous:
+                continue
+            subscriptions = by_field.get(field)
+            if not subscriptions and not any_field:
+                continue
+
+            event = ChangeEvent(field, old, new, timestamp)
+            published += 1
+            for group in (subscriptions or (), any_field):
+                for subscription in group:
+                    try:
+                        if subscription.predicate is not None and not subscription.predicate(event):
+                            continue
+                        if subscription.dispatcher is not None:
+                            subscription.dispatcher.post(subscription.callback, event,
+                                                         field if subscription.coalesce else None)
+                        else:
+                            subscription.callback(event)
+                    except Exception as e:
+                        # A faulty subscriber must not take the reader thread down
+                        print(f"Error in telemetry subscriber: {e}")
+        return published
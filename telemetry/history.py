@@ -0,0 +1,97 @@
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence, Tuple, Union
+from telemetry.schema import FLAG, FLOAT, INT, TelemetrySchema
+
+
+# History settings
+HISTORY_CAPACITY = 100_000  # rows, about 14 hours at the firmware's 2 frames per second
+
+# array typecode used to store each schema kind (text fields are not recorded)
+_TYPECODES = {
+    FLAG: "b",
+    INT: "i",
+    FLOAT: "d",
+}
+
+
+class TelemetryHistory:
+    """Fixed-capacity columnar history of the telemetry
+        One preallocated array per field plus a monotonic timestamp column, all sharing the same
+        row index. Every row is written twice (at i and i + capacity), so any window of up to
+        capacity rows is contiguous and handed out as a memoryview without copying.
+        Windows are live views: a later append overwrites the oldest rows, copy them if you keep them"""
+    def __init__(self, columns: Sequence[Tuple[str, str]], capacity: int = HISTORY_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = capacity
+        self.count = 0  # Rows ever appended
+        self._next = 0  # Slot of the next row, in [0, capacity)
+        self._timestamps = array("d", bytes(2 * capacity * array("d").itemsize))
+        self._columns: Dict[str, array] = {
+            name: array(typecode, bytes(2 * capacity * array(typecode).itemsize))
+            for name, typecode in columns
+        }
+
+    @classmethod
+    def from_schema(cls, schema: TelemetrySchema, capacity: int = HISTORY_CAPACITY) -> "TelemetryHistory":
+        """A history with one column per numeric field of the schema"""
+        columns = [(name, _TYPECODES[kind]) for name, kind in schema.fields if kind in _TYPECODES]
+        return cls(columns, capacity)
+
+    def fields(self) -> Tuple[str, ...]:
+        """Names of the recorded fields"""
+        return tuple(self._columns)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, values: Dict[str, Union[int, float, str, None]], timestamp: Optional[float] = None) -> bool:
+        """Record one frame in O(1), returns False if it holds none of the recorded fields
+            Fields missing from the frame repeat their previous value so the columns stay aligned"""
+        columns = self._columns
+        if not any(name in values for name in columns):
+            return False
+
+        i = self._next
+        j = i + self.capacity
+        self._timestamps[i] = self._timestamps[j] = time.monotonic() if timestamp is None else timestamp
+        for name, column in columns.items():
+            # j - 1 is always the previous row thanks to the mirrored layout
+            value = values.get(name, column[j - 1])
+            try:
+                column[i] = column[j] = value
+            except (TypeError, OverflowError):
+                column[i] = column[j] = column[j - 1]
+
+        # Publish the row: the slot first, then the count (readers take them in the opposite order)
+        self._next = i + 1 if i + 1 < self.capacity else 0
+        self.count += 1
+        return True
+
+    def _window(self, n: int) -> Tuple[int, int]:
+        """Start and end of the newest n rows in the mirrored arrays"""
+        size = min(n, self.count, self.capacity)
+        end = self._next + self.capacity
+        return end - size, end
+
+    def last(self, field: str, n: int) -> Tuple[memoryview, memoryview]:
+        """Timestamps and values of the newest n rows of a field, oldest first"""
+        start, end = self._window(n)
+        return memoryview(self._timestamps)[start:end], memoryview(self._columns[field])[start:end]
+
+    def since(self, field: str, timestamp: float) -> Tuple[memoryview, memoryview]:
+        """Timestamps and values of a field recorded at or after a monotonic timestamp"""
+        start, end = self._window(self.capacity)
+        timestamps = memoryview(self._timestamps)[start:end]
+        first = bisect_left(timestamps, timestamp)
+        return timestamps[first:], memoryview(self._columns[field])[start + first:end]
+
+    def latest(self) -> Optional[Tuple[float, Dict[str, float]]]:
+        """Timestamp and values of the newest row, or None if nothing was recorded"""
+        if self.count == 0:
+            return None
+        j = self._next + self.capacity - 1
+        return self._timestamps[j], {name: column[j] for name, column in self._columns.items()}
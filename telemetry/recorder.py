@@ -0,0 +1,361 @@
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from telemetry.schema import FINAL_INO_SCHEMA, FLAG, FLOAT, INT, TelemetrySchema
+
+
+# Recorder settings
+RECORDER_DIR = "database/telemetry"
+SEGMENT_RECORDS = 65536  # Records per segment file before rolling over to a new one
+INDEX_STRIDE = 256  # One sparse index entry every INDEX_STRIDE records
+READ_CHUNK = 256  # Records copied out of a segment's memory map at a time by queries
+MAX_SEGMENTS = 512  # Segments kept on disk, the oldest are deleted beyond (None keeps them all)
+MAX_AGE = 30 * 24 * 3600  # seconds, segments whose records are all older are deleted (None keeps them)
+FLUSH_INTERVAL = 0.5  # seconds, the writer waits this long to batch records together
+MAX_BATCH = 4096  # Records written with a single write() call at most
+MAX_PENDING = 65536  # Records queued for the writer before new ones are dropped
+LAYOUT_FILE = "layout.txt"
+
+# struct code used to store each schema kind (text fields are not recorded)
+_STRUCT_CODES = {
+    FLAG: "b",
+    INT: "i",
+    FLOAT: "d",
+}
+
+# Values each kind can store, anything else keeps the field's previous value
+_ACCEPTS = {
+    FLAG: lambda value: isinstance(value, int) and -128 <= value <= 127,
+    INT: lambda value: isinstance(value, int) and -2 ** 31 <= value < 2 ** 31,
+    FLOAT: lambda value: isinstance(value, (int, float)),
+}
+
+Row = Tuple[float, Dict[str, Union[int, float]]]
+
+
+class _Segment:
+    """One segment file and the number of records written to it"""
+    def __init__(self, segment_id: int, path: str, count: int = 0):
+        self.segment_id = segment_id
+        self.path = path
+        self.count = count
+
+
+class TelemetryRecorder:
+    """Append-only on-disk log of every telemetry frame
+        Frames become fixed-size records (wall-clock timestamp + one column per numeric schema field)
+        in rolling segment files. A background thread batches the writes, so record() never blocks
+        the serial reader. A sparse in-memory timestamp index turns range queries into a seek followed
+        by a short scan of the segments, each memory-mapped only while a query reads it. At every
+        rollover the oldest segments beyond max_segments, or older than max_age, are deleted"""
+    def __init__(self, directory: str = RECORDER_DIR, schema: TelemetrySchema = FINAL_INO_SCHEMA,
+                 segment_records: int = SEGMENT_RECORDS, index_stride: int = INDEX_STRIDE,
+                 max_segments: Optional[int] = MAX_SEGMENTS, max_age: Optional[float] = MAX_AGE):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.index_stride = index_stride
+        self.max_segments = max(1, max_segments) if max_segments is not None else None
+        self.max_age = max_age
+        self.fields = [name for name, kind in schema.fields if kind in _STRUCT_CODES]
+        self._accepts = [_ACCEPTS[kind] for _, kind in schema.fields if kind in _STRUCT_CODES]
+        self._record = struct.Struct("<d" + "".join(_STRUCT_CODES[kind] for _, kind in schema.fields
+                                                    if kind in _STRUCT_CODES))
+
+        self.dropped = 0  # Records lost because the writer could not keep up
+        self._queue: "queue.Queue" = queue.Queue(MAX_PENDING)
+        self._lock = threading.Lock()  # Guards the segments and the index between writer and readers
+        self._segments: List[_Segment] = []
+        self._index_ts: List[float] = []  # Sparse index, parallel lists sorted by timestamp
+        self._index_pos: List[Tuple[int, int]] = []  # (position in _segments, record number)
+        self._last_row: List[Union[int, float]] = [0] * len(self.fields)
+        self._unseen = set(range(len(self.fields)))  # Fields without a value yet, nothing is written until empty
+        self._last_timestamp = 0.0
+        self._file = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._check_layout()
+        self._open_segments()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="TelemetryRecorder", daemon=True)
+        self._writer.start()
+
+    def _check_layout(self) -> None:
+        """Refuse to mix records of different layouts in the same directory"""
+        layout = f"{self._record.format}\n{', '.join(self.fields)}\n"
+        path = os.path.join(self.directory, LAYOUT_FILE)
+        if os.path.exists(path):
+            with open(path, "r") as layout_file:
+                if layout_file.read() != layout:
+                    raise ValueError(f"{self.directory} holds telemetry recorded with a different layout")
+        else:
+            with open(path, "w") as layout_file:
+                layout_file.write(layout)
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f"{segment_id:08d}.seg")
+
+    def _open_segments(self) -> None:
+        """Rebuild the sparse index of the existing segments and reopen the last one for appending"""
+        segment_ids = sorted(int(name[:-4]) for name in os.listdir(self.directory)
+                             if name.endswith(".seg") and name[:-4].isdigit())
+        size = self._record.size
+        last_row = None
+
+        for segment_id in segment_ids:
+            path = self._segment_path(segment_id)
+            count = os.path.getsize(path) // size
+            if count == 0:
+                continue
+            self._segments.append(_Segment(segment_id, path, count))
+
+            with open(path, "rb") as segment_file, \
+                    mmap.mmap(segment_file.fileno(), count * size, access=mmap.ACCESS_READ) as view:
+                for record in range(0, count, self.index_stride):
+                    self._add_index(self._record.unpack_from(view, record * size)[0],
+                                    len(self._segments) - 1, record)
+                last_row = self._record.unpack_from(view, (count - 1) * size)
+
+        if last_row is not None:
+            self._last_timestamp = last_row[0]
+            self._last_row = list(last_row[1:])
+            self._unseen.clear()
+
+        # Keep appending to the last segment if it has room, dropping any torn record at its end
+        if self._segments and self._segments[-1].count < self.segment_records:
+            segment = self._segments[-1]
+            self._file = open(segment.path, "r+b")
+            self._file.truncate(segment.count * size)
+            self._file.seek(0, os.SEEK_END)
+            self._expire_segments()
+        else:
+            self._start_segment()
+
+    def _start_segment(self) -> None:
+        """Close the active segment, start a new one and delete the segments past retention"""
+        if self._file is not None:
+            self._file.close()
+
+        segment_id = self._segments[-1].segment_id + 1 if self._segments else 1
+        segment = _Segment(segment_id, self._segment_path(segment_id))
+        self._file = open(segment.path, "wb")
+        self._segments.append(segment)
+        self._expire_segments()
+
+    def _expire_segments(self) -> None:
+        """Delete the oldest segments beyond max_segments or entirely older than max_age, holding the lock
+            The active segment is never deleted"""
+        expired = max(0, len(self._segments) - self.max_segments) if self.max_segments is not None else 0
+        if self.max_age is not None:
+            oldest_kept = time.time() - self.max_age
+            # Every record of a segment is older than the first record of the next one
+            while expired < len(self._segments) - 1:
+                first = self._first_timestamp(expired + 1)
+                if first is None or first >= oldest_kept:
+                    break
+                expired += 1
+
+        removed = 0
+        for segment in self._segments[:expired]:
+            try:
+                os.remove(segment.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # e.g. still mapped by a query on Windows, tried again at the next rollover
+                print(f"Could not delete telemetry segment {segment.path}: {e}")
+                break
+            removed += 1
+        if removed == 0:
+            return
+
+        del self._segments[:removed]
+        cut = bisect_left(self._index_pos, (removed, 0))
+        del self._index_ts[:cut]
+        self._index_pos = [(position - removed, record) for position, record in self._index_pos[cut:]]
+
+    def _first_timestamp(self, position: int) -> Optional[float]:
+        """Timestamp of the first record of a segment, None if it has none yet"""
+        entry = bisect_left(self._index_pos, (position, 0))
+        if entry < len(self._index_pos) and self._index_pos[entry] == (position, 0):
+            return self._index_ts[entry]
+        return None
+
+    def _add_index(self, timestamp: float, position: int, record: int) -> None:
+        self._index_ts.append(timestamp)
+        self._index_pos.append((position, record))
+
+    def record(self, values: Dict[str, Union[int, float, str, None]], timestamp: Optional[float] = None) -> bool:
+        """Queue a frame for writing, never blocks
+            Returns False if the frame has none of the recorded fields or the queue is full.
+            A field missing from a frame keeps its previous value; the frames before every field
+            has been seen once are not written"""
+        if not any(name in values for name in self.fields):
+            return False
+
+        try:
+            self._queue.put_nowait((time.time() if timestamp is None else timestamp, values))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _writer_loop(self) -> None:
+        """Body of the writer thread: wait for a record, gather a batch, write it at once"""
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < MAX_BATCH and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            if batch[-1] is None:
+                running = False  # close() was called
+                batch.pop()
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                print(f"Error writing telemetry log: {e}")
+            finally:
+                for _ in range(len(batch) + (0 if running else 1)):
+                    self._queue.task_done()
+
+        self._file.close()
+        self._file = None
+
+    def _seed(self, batch: List[Tuple[float, Dict]]) -> List[Tuple[float, Dict]]:
+        """Fill the row from the first frames until every field has had a value, returns the frames left to write
+            Records start there: before it a field never seen would read as 0 (e.g. an occupied spot)"""
+        for k, (_, values) in enumerate(batch):
+            for i, name in enumerate(self.fields):
+                value = values.get(name)
+                if value is not None and self._accepts[i](value):
+                    self._last_row[i] = value
+                    self._unseen.discard(i)
+            if not self._unseen:
+                return batch[k:]
+        return []
+
+    def _write_batch(self, batch: List[Tuple[float, Dict]]) -> None:
+        """Pack a batch into one buffer per segment and append it"""
+        if self._unseen:
+            batch = self._seed(batch)
+        size = self._record.size
+        row = self._last_row
+        fields = self.fields
+        done = 0
+
+        while done < len(batch):
+            segment = self._segments[-1]
+            room = min(len(batch) - done, self.segment_records - segment.count)
+            buffer = bytearray(room * size)
+            first_record = segment.count
+
+            for k in range(room):
+                timestamp, values = batch[done + k]
+                # Timestamps never go backwards so the index stays sorted
+                timestamp = max(timestamp, self._last_timestamp)
+                self._last_timestamp = timestamp
+                for i, name in enumerate(fields):
+                    value = values.get(name)
+                    if value is not None and self._accepts[i](value):
+                        row[i] = value
+                self._record.pack_into(buffer, k * size, timestamp, *row)
+
+            self._file.write(buffer)
+            self._file.flush()
+
+            # Publish the new records to readers
+            with self._lock:
+                segment.count += room
+                position = len(self._segments) - 1
+                for record in range(first_record, segment.count):
+                    if record % self.index_stride == 0:
+                        self._add_index(self._record.unpack_from(buffer, (record - first_record) * size)[0],
+                                        position, record)
+                if segment.count >= self.segment_records:
+                    self._start_segment()
+            done += room
+
+    def _iter_records(self, path: str, first: int, count: int) -> Iterator[tuple]:
+        """Unpack records of a segment lazily, READ_CHUNK at a time, mapping the file only meanwhile
+            A segment deleted by the retention since the caller looked it up yields nothing"""
+        if count <= 0:
+            return
+        size = self._record.size
+        stop = (first + count) * size
+        try:
+            segment_file = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with segment_file, mmap.mmap(segment_file.fileno(), stop, access=mmap.ACCESS_READ) as view:
+            for chunk in range(first * size, stop, READ_CHUNK * size):
+                # Slicing copies the chunk, so no buffer keeps the map open once the caller stops
+                yield from self._record.iter_unpack(view[chunk:min(chunk + READ_CHUNK * size, stop)])
+
+    def flush(self) -> None:
+        """Wait until every queued frame is on disk"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write what is left and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def query(self, start: float, end: float) -> List[Row]:
+        """All frames recorded between two wall-clock timestamps (inclusive), oldest first
+            The sparse index finds the first segment and record to look at, then the records are
+            decoded lazily, without holding the lock, and the scan stops at the first one past end"""
+        with self._lock:
+            entry = bisect_right(self._index_ts, start) - 1
+            position, record = self._index_pos[entry] if entry >= 0 else (0, 0)
+            segments = [(segment.path, segment.count) for segment in self._segments[position:]]
+
+        rows: List[Row] = []
+        for path, count in segments:
+            for values in self._iter_records(path, record, count - record):
+                timestamp = values[0]
+                if timestamp > end:
+                    return rows
+                if timestamp >= start:
+                    rows.append((timestamp, dict(zip(self.fields, values[1:]))))
+            record = 0
+        return rows
+
+    def last(self, seconds: float) -> List[Row]:
+        """Frames of the last given number of seconds"""
+        now = time.time()
+        return self.query(now - seconds, now)
+
+    def around(self, timestamp: float, before: float, after: float) -> List[Row]:
+        """Frames from before seconds ahead of a moment to after seconds past it"""
+        return self.query(timestamp - before, timestamp + after)
+
+    def find_edges(self, field: str, value: Union[int, float], start: float, end: float) -> List[float]:
+        """Timestamps where a field changes to a value, e.g. find_edges("Fire", 1, ...) for fire alarms"""
+        edges = []
+        previous = None
+        for timestamp, values in self.query(start, end):
+            current = values[field]
+            if current == value and previous is not None and previous != value:
+                edges.append(timestamp)
+            previous = current
+        return edges
+
+    def time_range(self) -> Optional[Tuple[float, float]]:
+        """Timestamps of the oldest and newest records on disk"""
+        with self._lock:
+            if not self._index_ts:
+                return None
+            newest = self._segments[-1] if self._segments[-1].count else self._segments[-2]
+            return self._index_ts[0], next(self._iter_records(newest.path, newest.count - 1, 1))[0]
@@ -0,0 +1,86 @@
+import re
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+
+
+# Field kinds
+FLAG = "flag"    # Digital sensor, always printed as 0 or 1
+INT = "int"      # Signed integer, e.g. an analogRead() value
+FLOAT = "float"  # Number printed with a decimal point
+TEXT = "text"    # Single word without spaces or commas
+
+# Regex for the printed value and the expression that converts the captured text.
+# Conversions match parse_line(), so both paths put the same values in the cache
+_KINDS = {
+    FLAG: (r"([01])", "_flag({})"),
+    INT: (r"(-?\d+)", "int({})"),
+    FLOAT: (r"(-?\d+\.\d*)", "float({})"),
+    TEXT: (r"([^,\s]+)", "{}"),
+}
+
+FrameParser = Callable[[str], Optional[Dict[str, Union[int, float, str, None]]]]
+
+
+class TelemetrySchema:
+    """A fixed telemetry frame: the fields in the order the firmware prints them and their kinds
+        Example: TelemetrySchema([("temp", INT), ("door", FLAG)]) matches "temp: 26, door: 1" """
+    def __init__(self, fields: Sequence[Tuple[str, str]], separator: str = ", ", delimiter: str = ": "):
+        for name, kind in fields:
+            if kind not in _KINDS:
+                raise ValueError(f"Unknown kind '{kind}' for field '{name}'")
+
+        self.fields = tuple(fields)
+        self.separator = separator
+        self.delimiter = delimiter
+        self.source = ""  # Generated parser source, kept for debugging
+        self._parser: Optional[FrameParser] = None
+
+    def field_names(self) -> Tuple[str, ...]:
+        """Names of the fields in frame order"""
+        return tuple(name for name, _ in self.fields)
+
+    def compile(self) -> FrameParser:
+        """Build (once) a parser specialised for this frame
+            The parser matches the whole line with one regex and converts every field with
+            straight-line code, no splitting, stripping or type guessing. It returns None for
+            lines that are not this frame so the caller can fall back to parse_line()"""
+        if self._parser is not None:
+            return self._parser
+
+        pattern = self.separator.join(
+            re.escape(name + self.delimiter) + _KINDS[kind][0] for name, kind in self.fields
+        )
+        args = [f"v{i}" for i in range(len(self.fields))]
+        values = ", ".join(
+            f"{name!r}: " + _KINDS[kind][1].format(arg) for (name, kind), arg in zip(self.fields, args)
+        )
+
+        # Same approach as collections.namedtuple: generate the function once, call it per line
+        self.source = (
+            "def parse_frame(data_line):\n"
+            "    match = _fullmatch(data_line)\n"
+            "    if match is None:\n"
+            "        return None\n"
+            f"    {', '.join(args)}, = match.groups()\n"
+            f"    return {{{values}}}\n"
+        )
+        namespace = {
+            "_fullmatch": re.compile(pattern).fullmatch,
+            "_flag": {"0": 0, "1": 1}.__getitem__,
+        }
+        exec(self.source, namespace)
+
+        self._parser = namespace["parse_frame"]
+        return self._parser
+
+
+# The frame printed by loop() in FINAL.ino
+FINAL_INO_SCHEMA = TelemetrySchema([
+    ("F1", FLAG),
+    ("F2", FLAG),
+    ("F3", FLAG),
+    ("In", FLAG),
+    ("Out", FLAG),
+    ("LDR", INT),
+    ("Rain", FLAG),
+    ("Fire", FLAG),
+])